@@ -0,0 +1,84 @@
+import bisect
+import re
+
+# Sorted-prefix search index over accounts.
+#
+# Every account contributes a few lowercase tokens (account id, username words, email and
+# its parts). `entries` keeps (token, key) pairs sorted, so a prefix lookup is a binary
+# search followed by a scan of only the matching run:
+#
+#   ('1024607066', 'user1'), ('gmail', 'user1'), ('mobeen', 'user1'), ('muhammad', 'user1'), ...
+#
+# An account is reported once, under its smallest matching token, which also makes the
+# (token, key) of the last result a stable cursor for the next page.
+
+SUMMARY_FIELDS = ('account_id', 'username', 'email', 'role', 'balance', 'is_locked')
+
+class AccountIndex:
+    def __init__(self):
+        self.entries = []
+        self.tokens = {} # account key -> sorted list of its tokens
+        self.summaries = {} # account key -> the fields shown in search results
+
+    @staticmethod
+    def tokenize(account):
+        tokens = {str(account.get('account_id', '')).strip().lower()}
+        tokens.update(re.split(r'\s+', str(account.get('username', '')).lower()))
+        email = str(account.get('email', '')).strip().lower()
+        tokens.add(email)
+        tokens.update(re.split(r'[@._+-]', email))
+        tokens.discard('')
+        return sorted(tokens)
+
+    def build(self, accounts):
+        self.tokens = {key: self.tokenize(acc) for key, acc in accounts.items()}
+        self.summaries = {key: {field: acc.get(field) for field in SUMMARY_FIELDS} for key, acc in accounts.items()}
+        self.entries = sorted((token, key) for key, tokens in self.tokens.items() for token in tokens)
+
+    def remove(self, key):
+        for token in self.tokens.pop(key, []):
+            i = bisect.bisect_left(self.entries, (token, key))
+            if i < len(self.entries) and self.entries[i] == (token, key): del self.entries[i]
+        self.summaries.pop(key, None)
+
+    def update(self, key, account):
+        self.remove(key)
+        self.tokens[key] = self.tokenize(account)
+        self.summaries[key] = {field: account.get(field) for field in SUMMARY_FIELDS}
+        for token in self.tokens[key]: bisect.insort(self.entries, (token, key))
+
+    def sync(self, accounts):
+        """Brings the index in line with `accounts`, touching only the accounts whose summary
+        changed (tokens come from summary fields too). No disk read is needed."""
+        for key in [key for key in self.tokens if key not in accounts]: self.remove(key)
+        for key, acc in accounts.items():
+            if self.summaries.get(key) != {field: acc.get(field) for field in SUMMARY_FIELDS}: self.update(key, acc)
+
+    def run_length(self, prefix):
+        """How many entries have a token starting with prefix (two binary searches)."""
+        return bisect.bisect_left(self.entries, (prefix + '\U0010ffff', '')) - bisect.bisect_left(self.entries, (prefix, ''))
+
+    def search(self, query, cursor=None, limit=20):
+        """Returns ([(key, summary)], next_cursor). The word with the shortest run of matching
+        entries is scanned; the other words must prefix-match some token of each result."""
+        words = str(query).lower().split()
+        # A later page keeps scanning the word its cursor came from
+        candidates = [word for word in words if cursor and str(cursor[0]).startswith(word)] or words
+        prefix = min(candidates, key=self.run_length) if candidates else ''
+        others = list(words)
+        if prefix: others.remove(prefix)
+        start = bisect.bisect_right(self.entries, tuple(cursor)) if cursor else bisect.bisect_left(self.entries, (prefix, ''))
+
+        results = []
+        last_entry = None
+        for i in range(start, len(self.entries)):
+            token, key = self.entries[i]
+            if not token.startswith(prefix): break
+            tokens = self.tokens[key]
+            # Report each account only under its first matching token
+            if next(t for t in tokens if t.startswith(prefix)) != token: continue
+            if not all(any(t.startswith(word) for t in tokens) for word in others): continue
+            if len(results) == limit: return results, list(last_entry)
+            results.append((key, self.summaries[key]))
+            last_entry = (token, key)
+        return results, None
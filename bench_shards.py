@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from shard_engine import ShardedEngine
+
+# Settlement throughput of the sharded engine for different shard counts.
+# Every shard persists its own state file after each round, which is the
+# per-settlement write the single user.json design serializes on.
+# COORD CPU and SHARD CPU are the CPU seconds of the parent and of the busiest worker.
+# With a free core per shard a round takes about their sum, since the coordinator and
+# the shards take turns; PROJECTED TX/S is that estimate. On fewer cores the shards
+# share them and only the measured TX/S counts.
+#
+#   python bench_shards.py --accounts 20000 --transfers 200000 --shards 1,2,4,8
+
+def make_workload(num_accounts, num_transfers, seed):
+    rng = random.Random(seed)
+    accounts = {str(1024600000 + i): 1_000_000.0 for i in range(num_accounts)}
+    ids = list(accounts)
+    transfers = []
+    for _ in range(num_transfers):
+        sender, receiver = rng.sample(ids, 2)
+        transfers.append({"id": str(uuid.UUID(int=rng.getrandbits(128))), "sender": sender, "receiver": receiver, "amount": round(rng.uniform(1, 500), 2)})
+    return accounts, transfers
+
+def run(accounts, transfers, num_shards, batch_size, persist):
+    with tempfile.TemporaryDirectory() as data_dir:
+        with ShardedEngine(accounts, num_shards, data_dir if persist else None) as engine:
+            shard_start = engine.shard_cpu_times()
+            start, cpu_start = time.perf_counter(), time.process_time()
+            for i in range(0, len(transfers), batch_size):
+                engine.submit(transfers[i:i + batch_size])
+                engine.settle()
+            elapsed, coord_cpu = time.perf_counter() - start, time.process_time() - cpu_start
+            shard_cpu = max(end - begin for begin, end in zip(shard_start, engine.shard_cpu_times()))
+            total = sum(engine.balances().values())
+        return elapsed, coord_cpu, shard_cpu, engine.stats, total
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded settlement throughput benchmark")
+    parser.add_argument('--accounts', type=int, default=20000)
+    parser.add_argument('--transfers', type=int, default=200000)
+    parser.add_argument('--batch', type=int, default=5000, help="transfers settled per round")
+    parser.add_argument('--shards', default="1,2,4,8")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-persist', action='store_true', help="keep shard state in memory only")
+    args = parser.parse_args()
+
+    accounts, transfers = make_workload(args.accounts, args.transfers, args.seed)
+    expected_total = sum(accounts.values())
+    print(f"{args.transfers} transfers across {args.accounts} accounts, {args.batch} per round, {os.cpu_count()} CPU cores")
+    print(f"{'SHARDS':>6} | {'SECONDS':>8} | {'TX/S':>8} | {'SPEEDUP':>7} | {'COORD CPU':>9} | {'SHARD CPU':>9} | {'PROJECTED TX/S':>14} | {'CROSS %':>7} | {'SETTLED':>8} | MONEY CONSERVED")
+    print("-" * 122)
+
+    baseline = None
+    for num_shards in [int(x) for x in args.shards.split(',')]:
+        elapsed, coord_cpu, shard_cpu, stats, total = run(accounts, transfers, num_shards, args.batch, not args.no_persist)
+        rate = args.transfers / elapsed
+        baseline = baseline or rate
+        cross_pct = 100.0 * stats['cross_shard'] / args.transfers
+        conserved = abs(total - expected_total) < 1e-3
+        projected = args.transfers / (coord_cpu + shard_cpu)
+        print(f"{num_shards:>6} | {elapsed:>8.2f} | {rate:>8.0f} | {rate / baseline:>6.2f}x | {coord_cpu:>8.2f}s | {shard_cpu:>8.2f}s | {projected:>14.0f} | {cross_pct:>6.1f}% | {stats['settled']:>8} | {conserved}")
+
+if __name__ == '__main__':
+    main()
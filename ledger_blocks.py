@@ -0,0 +1,97 @@
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from markle_tree import merkleTree
+except ImportError: # main.py warns about this; blocks then carry its placeholder root
+    merkleTree = None
+
+# Block headers for the settled ledger.
+#
+# Settled records are grouped into sealed blocks. Each header commits to the block's
+# Merkle root, the chain hash of its last record and the previous header's hash, so a
+# block is checked on its own and sealed blocks never change when the ledger grows:
+#
+#   [header 0] <- [header 1] <- [header 2] <- ...     (prev_header_hash)
+#       |             |             |
+#   merkle root   merkle root   merkle root           (over that block's records)
+
+def leaf_string(tx):
+    # Same leaf data as main.format_transaction_string (amount only)
+    return str(float(tx['final_amount']))
+
+def record_hash(tx):
+    # Same chain hash as commit_to_ledger: sha256(amount + previous hash)
+    return hashlib.sha256((leaf_string(tx) + tx['previous_hash']).encode()).hexdigest()
+
+def legacy_prefix_length(records):
+    """How many leading records predate the current hash format. Detected once, when a
+    ledger is migrated, and recorded in every header sealed after that."""
+    for count, tx in enumerate(records):
+        if record_hash(tx) == tx.get('hash'): return count
+    return len(records)
+
+def block_merkle_root(records):
+    if merkleTree is None: return "ERROR_LIB_MISSING"
+    mt = merkleTree()
+    mt.makeTreeFromArray([leaf_string(tx) for tx in records])
+    mt.calculateMerkleRoot()
+    return mt.getMerkleRoot()
+
+def header_hash(header):
+    fields = {key: value for key, value in header.items() if key != 'header_hash'}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+def make_header(height, first_index, records, prev_header_hash, sealed_at, legacy_hash_records=0):
+    """legacy_hash_records: the ledger's legacy prefix length (see legacy_prefix_length)."""
+    header = {
+        "height": height,
+        "first_index": first_index,
+        "last_index": first_index + len(records) - 1,
+        "tx_count": len(records),
+        "merkle_root": block_merkle_root(records),
+        "first_prev_hash": records[0]['previous_hash'],
+        "last_tx_hash": records[-1]['hash'],
+        "prev_header_hash": prev_header_hash,
+        "sealed_at": sealed_at,
+        # Records of this block whose own hash cannot be recomputed, only their links checked
+        "legacy_records": min(len(records), max(0, legacy_hash_records - first_index))
+    }
+    header['header_hash'] = header_hash(header)
+    return header
+
+def verify_block(job):
+    """job = (header, records, prev_header, legacy_hash_records). The last is only used for
+    headers sealed before they recorded legacy_records. Returns {'height', 'ok', 'errors'}."""
+    header, records, prev_header, legacy_hash_records = job
+    legacy_records = header.get('legacy_records')
+    if legacy_records is None: legacy_records = max(0, legacy_hash_records - header['first_index'])
+    errors = []
+    if header_hash(header) != header['header_hash']: errors.append("header hash mismatch")
+    expected_prev = prev_header['header_hash'] if prev_header else "0"
+    if header['prev_header_hash'] != expected_prev: errors.append("broken link to previous header")
+    if len(records) != header['tx_count']:
+        errors.append(f"expected {header['tx_count']} records, found {len(records)}")
+    elif records:
+        if block_merkle_root(records) != header['merkle_root']: errors.append("merkle root mismatch")
+        # Chain links inside the block, and across the boundary with the previous block.
+        # Each record's own hash is recomputed too, so an edited amount breaks the chain
+        prev_hash = prev_header['last_tx_hash'] if prev_header else "0"
+        if header['first_prev_hash'] != prev_hash: errors.append("chain does not continue from previous block")
+        for position, tx in enumerate(records):
+            if tx['previous_hash'] != prev_hash:
+                errors.append(f"chain broken at {tx['id']}")
+                break
+            if position >= legacy_records and record_hash(tx) != tx['hash']:
+                errors.append(f"hash mismatch at {tx['id']}")
+                break
+            prev_hash = tx['hash']
+        if prev_hash != header['last_tx_hash']: errors.append("last chain hash mismatch")
+    return {"height": header['height'], "ok": not errors, "errors": errors}
+
+def verify_blocks(jobs, workers=None):
+    """Verifies blocks independently; uses a process pool when there is more than one."""
+    if len(jobs) <= 1: return [verify_block(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(verify_block, jobs, chunksize=max(1, len(jobs) // 32)))
@@ -0,0 +1,298 @@
+import argparse
+import hashlib
+import http.client
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+# Concurrent-user load test for the Flask app.
+#
+# A scenario file describes the workload: K users log in, poll /api/check_updates on the
+# notifications.js interval and now and then submit a transfer, while an admin polls
+# /api/admin/queue on the admin_updates.js interval and approves what it finds. Every
+# level of `users` runs against a fresh scratch data directory (BANK_DATA_DIR), so the
+# real data/ is never touched and runs are comparable.
+#
+#   python load_test.py scenarios/default.json
+#   python load_test.py scenarios/smoke.json --mode server --users 10,40 --out report.json
+#
+# mode "client" drives `app` through Flask's test client; mode "server" starts a threaded
+# local server and sends real HTTP requests.
+
+PIN = '1234'
+FIRST_ACCOUNT = 3000000000
+
+# --- SESSIONS ---
+class ClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None):
+        resp = self.client.open(path, method=method, data=form)
+        return resp.status_code, resp.headers.get('Location', ''), resp.get_data()
+
+class HttpSession:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.cookies = {}
+
+    def request(self, method, path, form=None):
+        headers = {}
+        if self.cookies: headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if form:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            conn.request(method, path, body, headers)
+            resp = conn.getresponse()
+            data = resp.read()
+            for cookie in resp.headers.get_all('Set-Cookie') or []:
+                name, _, rest = cookie.partition('=')
+                self.cookies[name.strip()] = rest.split(';')[0]
+            return resp.status, resp.getheader('Location', ''), data
+        finally:
+            conn.close()
+
+# --- METRICS ---
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {} # endpoint -> [(latency_seconds, outcome)]
+
+    def record(self, endpoint, latency, outcome):
+        with self.lock: self.samples.setdefault(endpoint, []).append((latency, outcome))
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values: return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(samples, elapsed):
+    rows = {}
+    everything = []
+    for endpoint, items in sorted(samples.items()):
+        everything.extend(items)
+        rows[endpoint] = summarize_samples(items, elapsed)
+    rows['TOTAL'] = summarize_samples(everything, elapsed)
+    return rows
+
+def summarize_samples(items, elapsed):
+    latencies = sorted(latency for latency, _ in items)
+    count = len(items)
+    errors = sum(1 for _, outcome in items if outcome == 'error')
+    return {
+        "requests": count,
+        "throughput": round(count / elapsed, 2) if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "rejected": sum(1 for _, outcome in items if outcome == 'rejected'),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+# --- OUTCOME CHECKS ---
+# Form routes answer with redirects: where they redirect to tells success from a flash-and-retry.
+def check_login(status, location, body):
+    if status == 302 and (location.endswith('/dashboard') or location.endswith('/admin')): return 'ok'
+    return 'error'
+
+def check_json(expected_type):
+    def check(status, location, body):
+        if status != 200: return 'error'
+        try: return 'ok' if isinstance(json.loads(body), expected_type) else 'error'
+        except ValueError: return 'error'
+    return check
+
+def check_transfer(status, location, body):
+    if status != 302: return 'error'
+    if location.endswith('/dashboard'): return 'ok'
+    return 'rejected' if location.endswith('/send_money') else 'error'
+
+# /admin/process redirects to /admin whatever happened; only the flashed message tells.
+# Anything not listed (hash mismatch, missing accounts, no message at all) is an error.
+APPROVAL_FLASHES = (('Approved', 'ok'), ('Sender has insufficient funds', 'rejected'), ('not found in Queue', 'rejected'))
+
+def flashed_text(body):
+    # admin_dashboard.html renders each flashed message as "✓ <message>" in one box
+    text = body.decode('utf-8', 'replace')
+    start = text.find('✓ ')
+    return text[start:text.find('</div>', start)] if start != -1 else ''
+
+def check_approval(session):
+    def check(status, location, body):
+        if status != 302: return 'error'
+        # Follow the redirect like the browser does; that page render consumes the flash
+        _, _, page = session.request('GET', location)
+        message = flashed_text(page)
+        return next((outcome for phrase, outcome in APPROVAL_FLASHES if phrase in message), 'error')
+    return check
+
+def timed(stats, session, endpoint, check, method, path, form=None):
+    start = time.perf_counter()
+    try:
+        status, location, body = session.request(method, path, form)
+        latency = time.perf_counter() - start
+        outcome = check(status, location, body) # not timed: a check may issue its own request
+    except Exception:
+        latency = time.perf_counter() - start
+        status, location, body, outcome = None, '', b'', 'error'
+    stats.record(endpoint, latency, outcome)
+    return outcome, body
+
+# --- SCRATCH DATA ---
+def seed_data_dir(scenario, num_users):
+    data_dir = tempfile.mkdtemp(prefix='bank_load_')
+    if scenario.get('base_data'):
+        shutil.copytree(scenario['base_data'], data_dir, dirs_exist_ok=True)
+    user_path = os.path.join(data_dir, 'user.json')
+    users = {"accounts": {}}
+    if os.path.exists(user_path):
+        with open(user_path, 'r') as f: users = json.load(f)
+
+    pin_hash = hashlib.sha256(PIN.encode()).hexdigest()
+    balance = float(scenario.get('starting_balance', 1000000))
+    def account(account_id, username, role):
+        return {
+            "account_id": account_id, "pin_hash": pin_hash, "username": username, "balance": balance,
+            "failed_attempts": 0, "is_locked": False, "role": role, "created_at": "2025-01-01T10:00:00",
+            "last_login": "", "pnone_number": "", "address": "", "email": f"{username.replace(' ', '.').lower()}@loadtest.local",
+            "daily_limit": balance, "atm_withdrawal_limit": 1000.0, "international_withdrawal_limit": 2000.0, "pos_withdrawal_limit": 3000.0
+        }
+    users['accounts']['load_admin'] = account(FIRST_ACCOUNT - 1, "Load Admin", 'admin')
+    for i in range(num_users):
+        users['accounts'][f'load_user{i}'] = account(FIRST_ACCOUNT + i, f"Load User {i}", 'user')
+    with open(user_path, 'w') as f: json.dump(users, f, indent=4)
+    return data_dir
+
+# --- VIRTUAL USERS ---
+def run_user(index, num_users, scenario, new_session, stats, start_at, deadline):
+    rng = random.Random(f"{scenario.get('seed', 0)}:{index}")
+    session = new_session()
+    time.sleep(max(0.0, start_at - time.time()))
+    outcome, _ = timed(stats, session, 'POST /login', check_login, 'POST', '/login', {'account_id': str(FIRST_ACCOUNT + index), 'pin': PIN})
+    if outcome != 'ok': return
+
+    poll_interval = scenario.get('poll_interval', 2.5)
+    transfer_interval = scenario.get('transfer_interval', 15)
+    low, high = scenario.get('amount_range', [1, 200])
+    next_poll = time.time() + rng.uniform(0, poll_interval)
+    next_transfer = time.time() + rng.expovariate(1.0 / transfer_interval) if transfer_interval else None
+    while True:
+        now = time.time()
+        due = min(next_poll, next_transfer or next_poll)
+        if due >= deadline: return
+        if due > now: time.sleep(due - now)
+        if next_transfer is not None and next_transfer <= next_poll:
+            receiver = rng.choice([i for i in range(num_users) if i != index]) if num_users > 1 else index
+            form = {
+                'receiver_account': str(FIRST_ACCOUNT + receiver),
+                'amount': f"{rng.uniform(low, high):.2f}",
+                'mode': 'fast' if rng.random() < scenario.get('fast_ratio', 0.5) else 'standard'
+            }
+            timed(stats, session, 'POST /perform_transaction', check_transfer, 'POST', '/perform_transaction', form)
+            next_transfer += rng.expovariate(1.0 / transfer_interval)
+        else:
+            timed(stats, session, 'GET /api/check_updates', check_json(dict), 'GET', '/api/check_updates')
+            next_poll += poll_interval
+
+def run_admin(scenario, new_session, stats, deadline):
+    admin = scenario.get('admin', {})
+    poll_interval = admin.get('poll_interval', 2.0)
+    approvals = admin.get('approvals_per_poll', 5)
+    session = new_session()
+    outcome, _ = timed(stats, session, 'POST /login', check_login, 'POST', '/login', {'account_id': str(FIRST_ACCOUNT - 1), 'pin': PIN})
+    if outcome != 'ok': return
+
+    next_poll = time.time()
+    while next_poll < deadline:
+        time.sleep(max(0.0, next_poll - time.time()))
+        outcome, body = timed(stats, session, 'GET /api/admin/queue', check_json(list), 'GET', '/api/admin/queue')
+        if outcome == 'ok':
+            # Approve the oldest standard-mode items at their queued amount; fast ones auto-approve
+            pending = [tx for tx in json.loads(body) if tx.get('mode') == 'standard'][:approvals]
+            for tx in pending:
+                if time.time() >= deadline: break
+                form = {'tx_id': tx['id'], 'action': 'approve', 'amount': tx['amount']}
+                timed(stats, session, 'POST /admin/process', check_approval(session), 'POST', '/admin/process', form)
+        next_poll += poll_interval
+
+# --- RUNNER ---
+def run_level(scenario, num_users, mode):
+    data_dir = seed_data_dir(scenario, num_users)
+    os.environ['BANK_DATA_DIR'] = data_dir
+    import main as bank # after BANK_DATA_DIR so nothing touches the real data/
+    bank.init_files()
+
+    server = None
+    if mode == 'server':
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, bank.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        new_session = lambda: HttpSession('127.0.0.1', server.server_port)
+    else:
+        new_session = lambda: ClientSession(bank.app)
+
+    stats = Stats()
+    ramp_up = scenario.get('ramp_up', 0)
+    begin = time.time()
+    deadline = begin + ramp_up + scenario.get('duration', 30)
+    threads = [threading.Thread(target=run_admin, args=(scenario, new_session, stats, deadline), daemon=True)]
+    for i in range(num_users):
+        # Users start evenly spread over the ramp-up period
+        start_at = begin + (ramp_up * i / num_users if num_users else 0)
+        threads.append(threading.Thread(target=run_user, args=(i, num_users, scenario, new_session, stats, start_at, deadline), daemon=True))
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.time() - begin
+
+    if server: server.shutdown()
+    shutil.rmtree(data_dir, ignore_errors=True)
+    return {"users": num_users, "elapsed": round(elapsed, 2), "endpoints": summarize(stats.samples, elapsed)}
+
+def print_level(result):
+    print(f"\n{result['users']} users, {result['elapsed']}s")
+    print(f"{'ENDPOINT':<28} | {'REQS':>6} | {'REQ/S':>7} | {'P50 MS':>8} | {'P95 MS':>8} | {'P99 MS':>8} | {'ERR %':>6} | {'REJECTED':>8}")
+    print("-" * 102)
+    for endpoint, row in result['endpoints'].items():
+        print(f"{endpoint:<28} | {row['requests']:>6} | {row['throughput']:>7.2f} | {row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f} | {row['p99_ms']:>8.2f} | {row['error_rate'] * 100:>5.1f}% | {row['rejected']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test")
+    parser.add_argument('scenario', help="scenario JSON file")
+    parser.add_argument('--mode', choices=['client', 'server'], help="overrides the scenario's mode")
+    parser.add_argument('--users', help="comma-separated user counts, overrides the scenario")
+    parser.add_argument('--duration', type=float, help="seconds per level after ramp-up, overrides the scenario")
+    parser.add_argument('--out', help="write the full report as JSON")
+    args = parser.parse_args()
+
+    with open(args.scenario, 'r') as f: scenario = json.load(f)
+    if args.duration is not None: scenario['duration'] = args.duration
+    mode = args.mode or scenario.get('mode', 'client')
+    levels = [int(x) for x in args.users.split(',')] if args.users else scenario.get('users', [10])
+    if isinstance(levels, int): levels = [levels]
+
+    print(f"Scenario '{scenario.get('name', args.scenario)}' ({mode} mode, seed {scenario.get('seed', 0)})")
+    results = []
+    for num_users in levels:
+        result = run_level(scenario, num_users, mode)
+        print_level(result)
+        results.append(result)
+
+    if args.out:
+        with open(args.out, 'w') as f: json.dump({"scenario": scenario, "mode": mode, "levels": results}, f, indent=4)
+        print(f"\nReport written to {args.out}")
+
+if __name__ == '__main__':
+    main()
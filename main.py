@@ -7,6 +7,13 @@ import uuid
 from datetime import datetime, timedelta
 import io
 import csv
+import gzip
+import base64
+import lzma
+import sys
+import atexit
+import bisect
+import threading
 
 # --- OPTIONAL: PDF GENERATION SUPPORT ---
 try:
@@ -15,19 +22,42 @@ except ImportError:
     print("WARNING: fpdf module not found. PDF generation will be disabled.")
     FPDF = None
 
+from replica import LedgerReplica, append_log_entry, log_size
+from ledger_blocks import legacy_prefix_length, make_header, verify_blocks
+from account_index import AccountIndex
+
 # --- IMPORT MERKLE TREE ---
 try:
-    from markle_tree import merkleTree
+    from markle_tree import merkleTree, appendOnlyTree
+    MERKLE_AVAILABLE = True
 except ImportError:
     print("WARNING: markle_tree.py not found. Please ensure the file exists.")
+    MERKLE_AVAILABLE = False # nothing permanent (block headers, published roots) is written
     class merkleTree:
         def makeTreeFromArray(self, arr): pass
         def calculateMerkleRoot(self): return "ERROR_LIB_MISSING"
         def getMerkleRoot(self): return "ERROR_LIB_MISSING"
+    class appendOnlyTree:
+        def __init__(self): self.leaves = 0
+        def size(self): return self.leaves
+        def append(self, data): self.leaves += 1
+        def rootHash(self, n=None): return "ERROR_LIB_MISSING"
+        def consistencyProof(self, m, n=None): raise ValueError("markle_tree.py is missing")
 
 app = Flask(__name__)
 app.secret_key = 'Key'
 
+# --- READ REPLICA ---
+# Set by start_replica(); when present the process serves read-only routes from the
+# replica's in-memory state instead of the data files.
+replica = None
+REPLICATION_LOG = 'replication.log'
+REPLICATION_LOG_MAX_BYTES = 16 * 1024 * 1024 # rotated to replication.log.1 past this
+# Replication logging is opt-in: start the primary with BANK_REPLICATION=1 to feed replicas
+REPLICATION = os.environ.get('BANK_REPLICATION') == '1'
+# Where a replica sends logins (they write failed_attempts/last_login), e.g. http://primary:5000
+PRIMARY_URL = os.environ.get('BANK_PRIMARY_URL', '').rstrip('/')
+
 # --- SETUP FLASK-LOGIN ---
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -37,7 +67,9 @@ login_manager.login_view = 'login'
 def get_json_path(filename):
     # Uses absolute path to ensure PythonAnywhere can find the files
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(base_dir, 'data', filename)
+    # BANK_DATA_DIR points the app at another data directory (e.g. a load test's scratch copy)
+    data_dir = os.environ.get('BANK_DATA_DIR') or os.path.join(base_dir, 'data')
+    return os.path.join(data_dir, filename)
 
 def init_files():
     """Ensures all JSON files exist on startup."""
@@ -46,14 +78,19 @@ def init_files():
     files = {
         'user.json': {"accounts": {}},
         'snapshots.json': [],
-        'transaction.json': []
+        'aggregates.json': empty_aggregates(),
+        'blocks.json': []
     }
     for filename, default_data in files.items():
         path = get_json_path(filename)
         if not os.path.exists(path):
             with open(path, 'w') as f: json.dump(default_data, f, indent=4)
+    # Creates the segment manifest, migrating a legacy transaction.json if present
+    load_manifest()
+    load_checkpoint_index()
 
 def load_json(filename):
+    if replica and filename == 'user.json': return replica.user_data()
     path = get_json_path(filename)
     if not os.path.exists(path) or os.stat(path).st_size == 0:
         if filename == 'user.json': return {"accounts": {}}
@@ -66,18 +103,66 @@ def load_json(filename):
 
 def save_json(filename, data):
     path = get_json_path(filename)
+    if filename == 'user.json':
+        mtime_before = file_mtime(path)
+        if REPLICATION: publish_account_changes(data)
     try:
-        with open(path, 'w') as f: json.dump(data, f, indent=4)
+        write_json_atomic(path, data)
     except Exception as e:
         print(f"Error saving {filename}: {e}")
+    if filename == 'user.json': refresh_account_index(data, mtime_before)
+
+def load_json_strict(filename):
+    """Like load_json, but only a missing file reads as empty; an unreadable one raises."""
+    path = get_json_path(filename)
+    if not os.path.exists(path): return []
+    with open(path, 'r') as f: return json.load(f)
+
+def write_json_atomic(path, data, indent=4):
+    # Written aside and swapped in, so concurrent readers never see a half-written file
+    with open(path + '.tmp', 'w') as f: json.dump(data, f, indent=indent)
+    os.replace(path + '.tmp', path)
+
+def publish_account_changes(data):
+    # Only the accounts that differ from what is on disk go into the replication log
+    old_accounts = load_json('user.json')['accounts']
+    changed = {key: acc for key, acc in data['accounts'].items() if old_accounts.get(key) != acc}
+    removed = [key for key in old_accounts if key not in data['accounts']]
+    if changed or removed: replicate({"type": "accounts", "accounts": changed, "removed": removed})
+
+def replicate(entry):
+    if REPLICATION: append_log_entry(get_json_path(REPLICATION_LOG), entry, REPLICATION_LOG_MAX_BYTES)
+
+def file_mtime(path):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+# --- ACCOUNT SEARCH INDEX ---
+# Prefix index over account id, username and email tokens for the admin accounts view.
+# save_json keeps it in step with every user.json write from this process; if the file
+# changed any other way (another worker, a manual edit) it is rebuilt on the next search.
+account_index = AccountIndex()
+account_index_mtime = None # user.json mtime the index reflects
+
+def get_account_index():
+    global account_index_mtime
+    mtime = file_mtime(get_json_path('user.json'))
+    if account_index_mtime is None or mtime != account_index_mtime:
+        account_index.build(load_json('user.json')['accounts'])
+        account_index_mtime = mtime
+    return account_index
+
+def refresh_account_index(data, mtime_before):
+    global account_index_mtime
+    if account_index_mtime is None or account_index_mtime != mtime_before: return # stale, rebuilt lazily
+    account_index.sync(data['accounts'])
+    account_index_mtime = file_mtime(get_json_path('user.json'))
 
 # --- MERKLE HELPER ---
 def format_transaction_string(tx_id, sender, receiver, amount, timestamp):
     # Hash ONLY the amount to prevent timestamp mismatch errors during verification
     return str(float(amount))
 
-def get_merkle_root():
-    transactions = load_json('transaction.json')
+def compute_merkle_root(transactions):
     if not transactions: return "Empty Tree"
     tx_strings = []
     for tx in transactions:
@@ -88,17 +173,618 @@ def get_merkle_root():
     mt.calculateMerkleRoot()
     return mt.getMerkleRoot()
 
+# --- LEDGER SEGMENTS ---
+# The ledger is split into monthly segment files under data/ledger/. manifest.json records
+# each segment's index range, chain hashes, timestamp range and Merkle root. Only the newest
+# ("hot") segment is plain JSON; closed segments are compressed and only opened on demand.
+LEDGER_DIR = 'ledger'
+LEDGER_COMPRESSION = 'gzip' # 'gzip' or 'lzma'
+COMPRESSORS = {'gzip': (gzip.open, '.gz'), 'lzma': (lzma.open, '.xz')}
+
+def get_ledger_path(filename):
+    return get_json_path(os.path.join(LEDGER_DIR, filename))
+
+def segment_key(timestamp):
+    # Segments are named by month: 'YYYY-MM'
+    try: return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m")
+    except (TypeError, ValueError): return datetime.now().strftime("%Y-%m")
+
+def write_ledger_file(filename, data):
+    write_json_atomic(get_ledger_path(filename), data)
+
+def save_manifest(manifest):
+    write_ledger_file('manifest.json', manifest)
+
+def load_manifest():
+    path = get_ledger_path('manifest.json')
+    if not os.path.exists(path): migrate_legacy_ledger()
+    # No fallback to an empty manifest: that would hide, and then overwrite, the whole ledger
+    with open(path, 'r') as f: manifest = json.load(f)
+    # Closed segments from before per-segment account lists existed
+    stale = [segment for segment in manifest['segments'] if segment['closed'] and 'accounts' not in segment]
+    for segment in stale: segment['accounts'] = segment_accounts(read_segment(segment))
+    # Ledgers migrated before the legacy hash boundary was recorded: detected once, here
+    unmarked = 'legacy_hash_records' not in manifest
+    if unmarked:
+        manifest['legacy_hash_records'] = 0
+        for segment in manifest['segments']:
+            manifest['legacy_hash_records'] += legacy_prefix_length(read_segment(segment))
+            if manifest['legacy_hash_records'] <= segment['last_index']: break
+    if stale or unmarked: save_manifest(manifest)
+    return manifest
+
+def read_segment(segment):
+    """Raises FileNotFoundError if the segment's file is gone, rather than dropping its records."""
+    path = get_ledger_path(segment['file'])
+    if not segment.get('compression') and not os.path.exists(path):
+        # Closed since our manifest was read: the plain file is removed once the .gz is listed
+        for compression, (opener, suffix) in COMPRESSORS.items():
+            if os.path.exists(path + suffix): return read_segment(dict(segment, file=segment['file'] + suffix, compression=compression))
+    if segment.get('compression'):
+        opener = COMPRESSORS[segment['compression']][0]
+        with opener(path, 'rt') as f: return json.load(f)
+    with open(path, 'r') as f: return json.load(f)
+
+def write_segment(segment, records):
+    write_ledger_file(segment['file'], records)
+    segment['count'] = len(records)
+    segment['last_index'] = segment['first_index'] + len(records) - 1
+    segment['last_hash'] = records[-1]['hash'] if records else segment['first_prev_hash']
+    timestamps = [tx['timestamp'] for tx in records]
+    segment['min_timestamp'] = min(timestamps) if timestamps else None
+    segment['max_timestamp'] = max(timestamps) if timestamps else None
+    segment['merkle_root'] = compute_merkle_root(records)
+
+def close_segment(segment, records):
+    """Compresses a finished segment; it is never rewritten again. Returns the plain file's
+    path, which the caller removes only after the manifest pointing at the archive is saved."""
+    opener, suffix = COMPRESSORS[LEDGER_COMPRESSION]
+    plain_path = get_ledger_path(segment['file'])
+    segment['file'] = f"{segment['name']}.json{suffix}"
+    path = get_ledger_path(segment['file'])
+    with opener(path + '.tmp', 'wt') as f: json.dump(records, f)
+    os.replace(path + '.tmp', path)
+    segment['compression'] = LEDGER_COMPRESSION
+    segment['closed'] = True
+    segment['accounts'] = segment_accounts(records)
+    return plain_path
+
+def segment_accounts(records):
+    # Sorted ids of every sender/receiver, so per-account reads can skip a closed segment unopened
+    return sorted({str(tx['sender']).strip() for tx in records} | {str(tx['receiver']).strip() for tx in records})
+
+def segment_involves(segment, account_id):
+    accounts = segment.get('accounts')
+    if accounts is None: return True # hot segment: always read
+    i = bisect.bisect_left(accounts, account_id)
+    return i < len(accounts) and accounts[i] == account_id
+
+def new_segment(key, first_index, prev_hash):
+    return {
+        "name": key,
+        "file": f"{key}.json",
+        "first_index": first_index,
+        "last_index": first_index - 1,
+        "count": 0,
+        "first_prev_hash": prev_hash,
+        "last_hash": prev_hash,
+        "min_timestamp": None,
+        "max_timestamp": None,
+        "merkle_root": "Empty Tree",
+        "closed": False,
+        "compression": None
+    }
+
+def append_ledger(records):
+    """Appends already hash-chained records, rolling over to a new segment when the month changes."""
+    if not records: return
+    manifest = load_manifest()
+    segments = manifest['segments']
+    first_index = segments[-1]['last_index'] + 1 if segments else 0
+    hot = segments[-1] if segments and not segments[-1]['closed'] else None
+    hot_records = read_segment(hot) if hot else []
+    closed_files = []
+    for record in records:
+        key = segment_key(record['timestamp'])
+        if hot is None or key > hot['name']:
+            if hot:
+                write_segment(hot, hot_records)
+                closed_files.append(close_segment(hot, hot_records))
+            next_index = segments[-1]['last_index'] + 1 if segments else 0
+            prev_hash = segments[-1]['last_hash'] if segments else "0"
+            hot = new_segment(key, next_index, prev_hash)
+            segments.append(hot)
+            hot_records = []
+        hot_records.append(record)
+    write_segment(hot, hot_records)
+    save_manifest(manifest)
+    for path in closed_files: os.remove(path)
+    replicate({"type": "ledger", "first_index": first_index, "records": records})
+
+def migrate_legacy_ledger():
+    """One-time split of the old single transaction.json into monthly segments."""
+    os.makedirs(get_ledger_path(''), exist_ok=True)
+    legacy = load_json('transaction.json')
+    # Old records use an older hash format; block audits check only their links
+    save_manifest({"segments": [], "legacy_hash_records": legacy_prefix_length(legacy)})
+    if legacy:
+        append_ledger(legacy)
+        os.replace(get_json_path('transaction.json'), get_json_path('transaction.json.migrated'))
+
+def ledger_length():
+    if replica: return replica.ledger_length()
+    segments = load_manifest()['segments']
+    return segments[-1]['last_index'] + 1 if segments else 0
+
+def ledger_tail_hash():
+    segments = load_manifest()['segments']
+    return segments[-1]['last_hash'] if segments else "0"
+
+def load_ledger():
+    if replica: return [tx for _, tx in replica.iter_forward()]
+    ledger = []
+    for segment in load_manifest()['segments']: ledger.extend(read_segment(segment))
+    return ledger
+
+def load_ledger_from(index):
+    """Records with ledger index >= index, opening only the segments that hold them."""
+    ledger = []
+    for segment in load_manifest()['segments']:
+        if segment['last_index'] < index: continue
+        records = read_segment(segment)
+        ledger.extend(records[max(0, index - segment['first_index']):])
+    return ledger
+
+def load_ledger_range(start, end):
+    """Records from segments whose timestamp range overlaps [start, end)."""
+    if replica: return load_ledger()
+    ledger = []
+    for segment in load_manifest()['segments']:
+        if not segment['min_timestamp']: continue
+        seg_start = datetime.strptime(segment['min_timestamp'], "%Y-%m-%d %H:%M:%S")
+        seg_end = datetime.strptime(segment['max_timestamp'], "%Y-%m-%d %H:%M:%S")
+        if seg_end < start or seg_start >= end: continue
+        ledger.extend(read_segment(segment))
+    return ledger
+
+def iter_ledger_reversed(before=None, account_id=None):
+    """Yields (index, tx) newest-first for indices below `before`.
+    Older segments are only opened if the caller keeps reading. With account_id, closed
+    segments that never mention the account are skipped unopened (on a replica, only that
+    account's records are yielded); callers still filter the records themselves."""
+    if replica:
+        yield from replica.iter_reversed(before, account_id)
+        return
+    account_id = str(account_id).strip() if account_id is not None else None
+    for segment in reversed(load_manifest()['segments']):
+        if before is not None and segment['first_index'] >= before: continue
+        if account_id is not None and not segment_involves(segment, account_id): continue
+        records = read_segment(segment)
+        for offset in range(len(records) - 1, -1, -1):
+            index = segment['first_index'] + offset
+            if before is not None and index >= before: continue
+            yield index, records[offset]
+
+def iter_ledger_forward(after=None, account_id=None):
+    """Yields (index, tx) oldest-first for indices above `after`."""
+    if replica:
+        yield from replica.iter_forward(after, account_id)
+        return
+    account_id = str(account_id).strip() if account_id is not None else None
+    for segment in load_manifest()['segments']:
+        if after is not None and segment['last_index'] <= after: continue
+        if account_id is not None and not segment_involves(segment, account_id): continue
+        records = read_segment(segment)
+        for offset, tx in enumerate(records):
+            index = segment['first_index'] + offset
+            if after is not None and index <= after: continue
+            yield index, tx
+
+# --- CURSOR PAGINATION ---
+# Cursors are opaque to clients but simply wrap the ledger index of the last item served.
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(index):
+    return base64.urlsafe_b64encode(f"ledger:{index}".encode()).decode()
+
+def decode_cursor(cursor):
+    if not cursor: return None
+    prefix, index = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+    if prefix != 'ledger': raise ValueError("Invalid cursor")
+    return int(index)
+
+# Account search positions are (token, key) pairs in the account index
+def encode_search_cursor(position):
+    if position is None: return None
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_search_cursor(cursor):
+    if not cursor: return None
+    try:
+        token, key = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return [str(token), str(key)]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def page_limit(value):
+    try: return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError): return PAGE_SIZE
+
+def ledger_page(match, cursor=None, limit=PAGE_SIZE, order='newest', account_id=None):
+    """Returns up to `limit` (index, tx) pairs accepted by `match`, plus the cursor for the next page.
+    account_id is only a hint for the replica's per-account index; `match` still decides."""
+    position = decode_cursor(cursor)
+    source = iter_ledger_forward(position, account_id) if order == 'oldest' else iter_ledger_reversed(position, account_id)
+    items = []
+    for index, tx in source:
+        if not match(tx): continue
+        if len(items) == limit: return items, encode_cursor(items[-1][0])
+        items.append((index, tx))
+    return items, None
+
+# --- BALANCE CHECKPOINTS ---
+# A checkpoint is every account's balance after the first `ledger_index` records,
+# stamped with the chain hash of the last record applied. Point-in-time queries and
+# crash recovery load the nearest checkpoint and replay only the tail of the ledger.
+# Each checkpoint's balances live in their own file under data/checkpoints/; index.json
+# only holds the small per-checkpoint metadata, so a commit never reads the full history.
+CHECKPOINT_INTERVAL = 50
+CHECKPOINT_DIR = 'checkpoints'
+RUN_MARKER = 'server.running' # present while the server runs; left behind by a crash
+
+def parse_query_time(value):
+    """Accepts 'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD' (treated as end of that day)."""
+    value = str(value).strip()
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d") + timedelta(days=1, seconds=-1)
+
+def account_balances(user_data):
+    return {str(acc.get('account_id', '')).strip(): float(acc.get('balance', 0)) for acc in user_data['accounts'].values()}
+
+def approver_index(user_data):
+    # Older records only carry the approver's username, so map admin names back to ids
+    return {acc.get('username'): str(acc.get('account_id', '')).strip() for acc in user_data['accounts'].values() if acc.get('role') == 'admin'}
+
+def apply_ledger_record(balances, tx, approvers, sign=1):
+    """Applies one ledger record to a balance map (sign=-1 undoes it)."""
+    sender = str(tx['sender']).strip()
+    receiver = str(tx['receiver']).strip()
+    balances[sender] = balances.get(sender, 0.0) - sign * float(tx['original_amount'])
+    balances[receiver] = balances.get(receiver, 0.0) + sign * float(tx['final_amount'])
+    # Theft/subsidy difference lands on the approving admin's account
+    difference = float(tx.get('theft_amount') or 0)
+    if difference:
+        approver_id = str(tx.get('approver_id') or approvers.get(tx.get('approver'), '')).strip()
+        if approver_id: balances[approver_id] = balances.get(approver_id, 0.0) + sign * difference
+
+def get_checkpoint_path(filename):
+    return get_json_path(os.path.join(CHECKPOINT_DIR, filename))
+
+def save_checkpoint_index(index):
+    write_json_atomic(get_checkpoint_path('index.json'), index)
+
+def load_checkpoint_balances(entry):
+    with open(get_checkpoint_path(entry['file']), 'r') as f: return json.load(f)['balances']
+
+def save_checkpoint_balances(entry, balances):
+    write_json_atomic(get_checkpoint_path(entry['file']), {"ledger_index": entry['ledger_index'], "balances": balances}, indent=None)
+
+def add_checkpoint(index, ledger_index, balances, last_tx, known_accounts):
+    """Writes the balance file and appends its metadata to the index."""
+    entry = {
+        "ledger_index": ledger_index,
+        "chain_hash": last_tx['hash'] if last_tx else "0",
+        "timestamp": last_tx['timestamp'] if last_tx else None,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "file": f"cp_{ledger_index:010d}.json",
+        "known_accounts": known_accounts # user.json account count last reconciled against
+    }
+    save_checkpoint_balances(entry, balances)
+    index.append(entry)
+    save_checkpoint_index(index)
+    return entry
+
+def load_checkpoint_index(user_data=None):
+    """Returns the checkpoint index, creating the genesis checkpoint if none exist yet."""
+    path = get_checkpoint_path('index.json')
+    if os.path.exists(path):
+        with open(path, 'r') as f: return json.load(f)
+    os.makedirs(get_checkpoint_path(''), exist_ok=True)
+    if user_data is None: user_data = load_json('user.json')
+    index = []
+    legacy = load_json('checkpoints.json')
+    if legacy:
+        # One-time split of the old single-file history
+        for cp in legacy: add_checkpoint(index, cp['ledger_index'], cp['balances'], {"hash": cp['chain_hash'], "timestamp": cp['timestamp']} if cp['ledger_index'] else None, 0)
+        os.replace(get_json_path('checkpoints.json'), get_json_path('checkpoints.json.migrated'))
+        return index
+    # Genesis: undo the whole ledger from the current balances to get the opening balances
+    balances = account_balances(user_data)
+    approvers = approver_index(user_data)
+    for _, tx in iter_ledger_reversed(): apply_ledger_record(balances, tx, approvers, sign=-1)
+    add_checkpoint(index, 0, balances, None, len(user_data['accounts']))
+    return index
+
+def reconcile_new_accounts(index, user_data):
+    """Accounts created after the latest checkpoint get an opening balance in it, derived by
+    undoing the ledger tail from their current balance. Checked only when the account count moves."""
+    last = index[-1]
+    if last.get('known_accounts') == len(user_data['accounts']): return
+    balances = load_checkpoint_balances(last)
+    current = account_balances(user_data)
+    new_ids = [acc_id for acc_id in current if acc_id not in balances]
+    if new_ids:
+        opening = {acc_id: current[acc_id] for acc_id in new_ids}
+        approvers = approver_index(user_data)
+        for tx in reversed(load_ledger_from(last['ledger_index'])): apply_ledger_record(opening, tx, approvers, sign=-1)
+        for acc_id in new_ids: balances[acc_id] = opening[acc_id]
+        save_checkpoint_balances(last, balances)
+    last['known_accounts'] = len(user_data['accounts'])
+    save_checkpoint_index(index)
+
+def replay_records(balances, records, approvers, until=None):
+    """Applies records in ledger order, stopping at the first one later than `until`."""
+    balances = dict(balances)
+    for tx in records:
+        if until is not None:
+            try:
+                if datetime.strptime(tx['timestamp'], "%Y-%m-%d %H:%M:%S") > until: break
+            except ValueError: pass
+        apply_ledger_record(balances, tx, approvers)
+    return balances
+
+def update_checkpoints(user_data):
+    """Called after ledger appends; writes a new checkpoint every CHECKPOINT_INTERVAL records."""
+    index = load_checkpoint_index(user_data)
+    reconcile_new_accounts(index, user_data)
+    last = index[-1]
+    pending = ledger_length() - last['ledger_index']
+    if pending < CHECKPOINT_INTERVAL: return
+    count = CHECKPOINT_INTERVAL * (pending // CHECKPOINT_INTERVAL)
+    records = load_ledger_from(last['ledger_index'])[:count]
+    balances = replay_records(load_checkpoint_balances(last), records, approver_index(user_data))
+    add_checkpoint(index, last['ledger_index'] + count, balances, records[-1], last['known_accounts'])
+
+def nearest_valid_checkpoint(index, ledger_index=None, when=None):
+    """Latest checkpoint at or before ledger_index/when whose chain hash still matches the ledger.
+    Returns (checkpoint entry, records after it)."""
+    for cp in reversed(index):
+        if ledger_index is not None and cp['ledger_index'] > ledger_index: continue
+        if when is not None and cp['timestamp'] and datetime.strptime(cp['timestamp'], "%Y-%m-%d %H:%M:%S") > when: continue
+        if cp['ledger_index'] == 0: return cp, load_ledger()
+        tail = load_ledger_from(cp['ledger_index'] - 1)
+        if tail and tail[0]['hash'] == cp['chain_hash']: return cp, tail[1:]
+    return None, []
+
+def balance_at(account_id, index=None, when=None):
+    """Balance of account_id after ledger record `index`, or as of datetime `when` (ledger order).
+    None if the account is unknown to the checkpoint history."""
+    account_id = str(account_id).strip()
+    if index is not None and not 0 <= index <= ledger_length(): raise ValueError("index out of range")
+    user_data = load_json('user.json')
+    cp, tail = nearest_valid_checkpoint(load_checkpoint_index(user_data), ledger_index=index, when=when)
+    if cp is None: return None
+    balances = load_checkpoint_balances(cp)
+    if account_id not in balances: return None
+    if index is not None: tail = tail[:max(0, index - cp['ledger_index'])]
+    return replay_records(balances, tail, approver_index(user_data), until=when).get(account_id)
+
+def recover_balances():
+    """Rebuilds user.json balances from the latest valid checkpoint plus the ledger tail.
+    Only accounts the checkpoint knows are touched; anything newer is left as it is."""
+    user_data = load_json('user.json')
+    cp, tail = nearest_valid_checkpoint(load_checkpoint_index(user_data))
+    if cp is None:
+        print("WARNING: No valid balance checkpoint found, balances were not recovered.")
+        return
+    known = load_checkpoint_balances(cp)
+    balances = replay_records(known, tail, approver_index(user_data))
+    changed = False
+    for acc in user_data['accounts'].values():
+        acc_id = str(acc.get('account_id', '')).strip()
+        if acc_id in known and abs(float(acc.get('balance', 0)) - balances[acc_id]) > 1e-6:
+            print(f"Recovered balance for {acc_id}: {acc.get('balance')} -> {balances[acc_id]}")
+            acc['balance'] = balances[acc_id]
+            changed = True
+    if changed: save_json('user.json', user_data)
+
+def startup_recovery(force=False):
+    """Recovers balances only if the last run did not shut down cleanly (or when forced),
+    then marks this run as in progress until a clean exit."""
+    marker = get_json_path(RUN_MARKER)
+    if force or os.path.exists(marker):
+        print("Previous run did not shut down cleanly, recovering balances..." if not force else "Recovering balances...")
+        recover_balances()
+    with open(marker, 'w') as f: f.write(str(os.getpid()))
+    atexit.register(lambda: os.path.exists(marker) and os.remove(marker))
+
+# --- MATERIALIZED AGGREGATES ---
+# Summary counters for the admin dashboard, updated per appended record instead of
+# scanning the ledger on every view. `ledger_index` is how many records are counted.
+AGGREGATES_VERSION = 2 # bump when the counters change shape; stored ones are then rebuilt
+
+def empty_aggregates():
+    return {
+        "version": AGGREGATES_VERSION,
+        "ledger_index": 0,
+        "tx_count": 0,
+        "total_volume": 0.0,
+        "count_by_mode": {},
+        "volume_by_mode": {},
+        "theft_diverted": 0.0,
+        "theft_subsidised": 0.0,
+        "count_by_approver": {},
+        "accounts": {}
+    }
+
+def add_to_aggregates(agg, tx, approvers):
+    mode = tx.get('mode', 'unknown')
+    original = float(tx['original_amount'])
+    final = float(tx['final_amount'])
+    difference = float(tx.get('theft_amount') or 0)
+    # Usernames can be edited, so count by id; older records only carry the name
+    name = tx.get('approver', 'Unknown')
+    approver = str(tx.get('approver_id') or approvers.get(name) or name).strip()
+
+    agg['ledger_index'] += 1
+    agg['tx_count'] += 1
+    agg['total_volume'] += original
+    agg['count_by_mode'][mode] = agg['count_by_mode'].get(mode, 0) + 1
+    agg['volume_by_mode'][mode] = agg['volume_by_mode'].get(mode, 0.0) + original
+    if difference > 0: agg['theft_diverted'] += difference
+    elif difference < 0: agg['theft_subsidised'] += abs(difference)
+    agg['count_by_approver'][approver] = agg['count_by_approver'].get(approver, 0) + 1
+
+    for acc_id, field, amount in ((str(tx['sender']).strip(), 'out', original), (str(tx['receiver']).strip(), 'in', final)):
+        totals = agg['accounts'].setdefault(acc_id, {"in": 0.0, "out": 0.0, "count": 0})
+        totals[field] += amount
+        totals['count'] += 1
+
+def rebuild_aggregates():
+    """Full ledger scan; only needed on first use or if the counters fall out of sync."""
+    agg = empty_aggregates()
+    approvers = approver_index(load_json('user.json'))
+    for _, tx in iter_ledger_forward(): add_to_aggregates(agg, tx, approvers)
+    save_json('aggregates.json', agg)
+    return agg
+
+def load_aggregates():
+    agg = load_json('aggregates.json')
+    if not agg or agg.get('version') != AGGREGATES_VERSION or agg.get('ledger_index') != ledger_length(): return rebuild_aggregates()
+    return agg
+
+def update_aggregates(records, user_data):
+    """Called after ledger appends with just the new records."""
+    agg = load_json('aggregates.json')
+    if not agg or agg.get('version') != AGGREGATES_VERSION or agg.get('ledger_index', 0) + len(records) != ledger_length():
+        rebuild_aggregates()
+        return
+    approvers = approver_index(user_data)
+    for tx in records: add_to_aggregates(agg, tx, approvers)
+    save_json('aggregates.json', agg)
+
+# --- LEDGER BLOCKS ---
+# Settled records are sealed into blocks of BLOCK_SIZE, or sooner once BLOCK_MAX_AGE
+# seconds have passed since the last seal. Headers live in blocks.json (see ledger_blocks.py).
+BLOCK_SIZE = 20
+BLOCK_MAX_AGE = 300
+
+def load_blocks():
+    # Strict: read as empty, the next seal would recompute and overwrite every sealed header
+    return load_json_strict('blocks.json')
+
+def seal_blocks():
+    """Seals any full (or overdue) blocks after the last sealed one. Returns how many were sealed."""
+    if replica or not MERKLE_AVAILABLE: return 0
+    blocks = load_blocks()
+    next_index = blocks[-1]['last_index'] + 1 if blocks else 0
+    if ledger_length() <= next_index: return 0
+    pending = load_ledger_from(next_index)
+
+    now = datetime.now()
+    last_sealed = datetime.strptime(blocks[-1]['sealed_at'], "%Y-%m-%d %H:%M:%S") if blocks else None
+    overdue = last_sealed is None or (now - last_sealed).total_seconds() >= BLOCK_MAX_AGE
+    legacy_records = load_manifest()['legacy_hash_records']
+
+    sealed = 0
+    while len(pending) >= BLOCK_SIZE or (pending and overdue):
+        records, pending = pending[:BLOCK_SIZE], pending[BLOCK_SIZE:]
+        prev_header_hash = blocks[-1]['header_hash'] if blocks else "0"
+        blocks.append(make_header(len(blocks), next_index, records, prev_header_hash, now.strftime("%Y-%m-%d %H:%M:%S"), legacy_records))
+        next_index += len(records)
+        sealed += 1
+    if sealed: write_json_atomic(get_json_path('blocks.json'), blocks)
+    return sealed
+
+def audit_blocks(from_height=0):
+    """Verifies sealed blocks from from_height onwards, in parallel across blocks."""
+    blocks = load_blocks()
+    if from_height >= len(blocks): return []
+    ledger = load_ledger_from(blocks[from_height]['first_index'])
+    base = blocks[from_height]['first_index']
+    legacy_records = load_manifest()['legacy_hash_records'] # for headers sealed before they recorded it
+    jobs = []
+    for height in range(from_height, len(blocks)):
+        header = blocks[height]
+        records = ledger[header['first_index'] - base:header['last_index'] - base + 1]
+        jobs.append((header, records, blocks[height - 1] if height > 0 else None, legacy_records))
+    return verify_blocks(jobs)
+
+# --- MERKLE CONSISTENCY ---
+# An RFC 6962 tree over the whole ledger. Every commit publishes its root to root_log.jsonl,
+# and auditors holding an old root can ask for an O(log n) proof that today's ledger only
+# appended to it (markle_tree.verifyConsistency checks it without the ledger).
+ROOT_LOG = 'root_log.jsonl'
+consistency_tree = None # built from the ledger on first use, then extended as it grows
+consistency_lock = threading.RLock() # one thread extends the tree and publishes at a time
+
+def ledger_leaf(tx):
+    # Leaves commit to the whole record, not just the amount
+    return json.dumps(tx, sort_keys=True)
+
+def get_consistency_tree():
+    global consistency_tree
+    with consistency_lock:
+        length = ledger_length()
+        if consistency_tree is None or consistency_tree.size() > length: consistency_tree = appendOnlyTree()
+        size = consistency_tree.size()
+        if size < length:
+            # The ledger may have grown since it was measured; the first records are still its prefix
+            records = load_ledger_from(size)[:length - size]
+            if len(records) != length - size:
+                raise RuntimeError(f"Ledger returned {len(records)} records after index {size}, expected {length - size}")
+            for tx in records: consistency_tree.append(ledger_leaf(tx))
+        return consistency_tree
+
+def publish_root():
+    if not MERKLE_AVAILABLE: return None
+    # Held across build and write, so every published root is the root of a real ledger prefix
+    with consistency_lock:
+        tree = get_consistency_tree()
+        entry = {"tree_size": tree.size(), "root_hash": tree.rootHash(), "published_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        with open(get_json_path(ROOT_LOG), 'a') as f: f.write(json.dumps(entry) + '\n')
+        return entry
+
+def load_root_log(after=0, limit=None):
+    """Published roots with tree_size > after, oldest first."""
+    path = get_json_path(ROOT_LOG)
+    if not os.path.exists(path): return []
+    entries = []
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip(): continue
+            entry = json.loads(line)
+            if entry['tree_size'] <= after: continue
+            entries.append(entry)
+            if limit and len(entries) == limit: break
+    return entries
+
+# --- LEDGER COMMIT ---
+def commit_to_ledger(records, user_data):
+    """Appends settled records and updates everything derived from the ledger."""
+    if not records: return
+    append_ledger(records)
+    update_checkpoints(user_data)
+    update_aggregates(records, user_data)
+    seal_blocks()
+    publish_root()
+
 # --- NEW: AUTO-PROCESSOR FOR FAST TRANSACTIONS ---
 def process_fast_transactions():
     """
     Checks snapshots.json for 'fast' transactions older than 30 seconds.
-    Moves them to transaction.json automatically.
+    Moves them to the ledger automatically.
     """
+    if replica: return # the primary settles; replicas only read
     snapshot = load_json('snapshots.json')
     if not snapshot: return
 
     user_data = load_json('user.json')
-    transactions = load_json('transaction.json')
+    new_records = []
+    prev_hash = None
 
     # Identify items to process
     updated_snapshot = []
@@ -141,7 +827,7 @@ def process_fast_transactions():
                     user_data['accounts'][receiver_key]['balance'] += amount
 
                     # Create Ledger Entry
-                    prev_hash = transactions[-1]['hash'] if len(transactions) > 0 else "0"
+                    if prev_hash is None: prev_hash = ledger_tail_hash()
                     ledger_string = format_transaction_string(tx['id'], sender_id, receiver_id, amount, tx['timestamp']) + prev_hash
                     current_hash = hashlib.sha256(ledger_string.encode()).hexdigest()
 
@@ -160,7 +846,8 @@ def process_fast_transactions():
                         "hash": current_hash,
                         "integrity_hash": tx.get('integrity_hash', 'N/A')
                     }
-                    transactions.append(record)
+                    new_records.append(record)
+                    prev_hash = current_hash
                 else:
                     # Insufficient funds (Auto Reject)
                     pass
@@ -173,7 +860,7 @@ def process_fast_transactions():
 
     if items_processed:
         save_json('user.json', user_data)
-        save_json('transaction.json', transactions)
+        commit_to_ledger(new_records, user_data)
         save_json('snapshots.json', updated_snapshot)
 
 # --- USER CLASS (Restored All Limits) ---
@@ -315,12 +1002,23 @@ def admin_dashboard():
     context = {'view': view, 'user': current_user}
     if view == 'queue': context['queue'] = load_json('snapshots.json')
     elif view == 'accounts':
-        data = load_json('user.json')
-        context['accounts'] = data['accounts']
+        # First page only; the search box pages through /api/admin/accounts/search
+        context['query'] = request.args.get('q', '')
+        results, next_cursor = get_account_index().search(context['query'], limit=PAGE_SIZE)
+        context['accounts'] = dict(results)
+        context['next_cursor'] = encode_search_cursor(next_cursor)
+    elif view == 'summary':
+        agg = load_aggregates()
+        context['aggregates'] = agg
+        context['approver_names'] = {str(acc.get('account_id', '')).strip(): acc.get('username') for acc in load_json('user.json')['accounts'].values()}
+        context['top_accounts'] = sorted(agg['accounts'].items(), key=lambda item: item[1]['in'] + item[1]['out'], reverse=True)[:20]
     elif view == 'ledger':
-        ledger = load_json('transaction.json')
-        context['ledger'] = list(reversed(ledger))
-        context['merkle_root'] = get_merkle_root()
+        # Rows are loaded page by page from /api/admin/ledger
+        seal_blocks()
+        blocks = load_blocks()
+        context['latest_block'] = blocks[-1] if blocks else None
+        context['recent_blocks'] = list(reversed(blocks[-10:]))
+        context['unsealed_count'] = ledger_length() - (blocks[-1]['last_index'] + 1 if blocks else 0)
     return render_template('admin_dashboard.html', **context)
 
 @app.route('/api/admin/queue')
@@ -332,6 +1030,64 @@ def api_admin_queue():
     queue = load_json('snapshots.json')
     return json.dumps(queue)
 
+@app.route('/api/admin/aggregates')
+@login_required
+def api_admin_aggregates():
+    if current_user.role != 'admin': return json.dumps({'success': False, 'message': 'Not allowed'}), 403
+    return json.dumps({'success': True, 'aggregates': load_aggregates()})
+
+@app.route('/admin/aggregates/rebuild', methods=['POST'])
+@login_required
+def admin_rebuild_aggregates():
+    if current_user.role != 'admin': return redirect(url_for('dashboard'))
+    agg = rebuild_aggregates()
+    flash(f"Aggregates rebuilt from {agg['tx_count']} ledger records.")
+    return redirect(url_for('admin_dashboard', view='summary'))
+
+@app.route('/api/admin/verify_blocks')
+@login_required
+def api_admin_verify_blocks():
+    """Block-by-block audit. ?from_height=N skips blocks already audited."""
+    if current_user.role != 'admin': return json.dumps({'success': False, 'message': 'Not allowed'}), 403
+    try: from_height = max(0, int(request.args.get('from_height', 0)))
+    except ValueError: return json.dumps({'success': False, 'message': 'Invalid from_height'}), 400
+    results = audit_blocks(from_height)
+    return json.dumps({'success': True, 'verified': len(results), 'ok': all(r['ok'] for r in results), 'blocks': results})
+
+@app.route('/admin/verify_blocks', methods=['POST'])
+@login_required
+def admin_verify_blocks():
+    if current_user.role != 'admin': return redirect(url_for('dashboard'))
+    results = audit_blocks()
+    failed = [r for r in results if not r['ok']]
+    if failed:
+        flash(f"Block audit FAILED for {len(failed)} of {len(results)} blocks: " + "; ".join(f"#{r['height']}: {', '.join(r['errors'])}" for r in failed[:5]))
+    else:
+        flash(f"Block audit passed: {len(results)} sealed blocks verified.")
+    return redirect(url_for('admin_dashboard', view='ledger'))
+
+@app.route('/api/admin/ledger')
+@login_required
+def api_admin_ledger():
+    if current_user.role != 'admin': return json.dumps({'success': False, 'message': 'Not allowed'}), 403
+    try:
+        items, next_cursor = ledger_page(lambda tx: True, request.args.get('cursor'), page_limit(request.args.get('limit')))
+    except ValueError:
+        return json.dumps({'success': False, 'message': 'Invalid cursor'}), 400
+    page = [{k: tx.get(k) for k in ('id', 'timestamp', 'sender', 'receiver', 'original_amount', 'final_amount', 'status')} for _, tx in items]
+    return json.dumps({'success': True, 'transactions': page, 'next_cursor': next_cursor})
+
+@app.route('/api/admin/accounts/search')
+@login_required
+def api_admin_account_search():
+    """?q= matches prefixes of account id, username words and email parts."""
+    if current_user.role != 'admin': return json.dumps({'success': False, 'message': 'Not allowed'}), 403
+    try: cursor = decode_search_cursor(request.args.get('cursor'))
+    except ValueError: return json.dumps({'success': False, 'message': 'Invalid cursor'}), 400
+    results, next_cursor = get_account_index().search(request.args.get('q', ''), cursor, page_limit(request.args.get('limit')))
+    accounts = [dict(summary, key=key) for key, summary in results]
+    return json.dumps({'success': True, 'accounts': accounts, 'next_cursor': encode_search_cursor(next_cursor)})
+
 @app.route('/admin/toggle_lock/<account_id>', methods=['POST'])
 @login_required
 def admin_toggle_lock(account_id):
@@ -425,8 +1181,7 @@ def admin_process():
 
                 save_json('user.json', data)
 
-                transactions = load_json('transaction.json')
-                prev_hash = transactions[-1]['hash'] if len(transactions) > 0 else "0"
+                prev_hash = ledger_tail_hash()
                 ledger_string = format_transaction_string(tx['id'], tx['sender_id'], tx['receiver_id'], final_amount, tx['timestamp']) + prev_hash
                 current_hash = hashlib.sha256(ledger_string.encode()).hexdigest()
 
@@ -441,12 +1196,12 @@ def admin_process():
                     "timestamp": tx['timestamp'],
                     "status": "APPROVED",
                     "approver": current_user.username,
+                    "approver_id": str(current_user.id).strip(),
                     "previous_hash": prev_hash,
                     "hash": current_hash,
                     "integrity_hash": tx.get('integrity_hash', 'N/A')
                 }
-                transactions.append(record)
-                save_json('transaction.json', transactions)
+                commit_to_ledger([record], data)
 
                 snapshot.remove(tx)
                 save_json('snapshots.json', snapshot)
@@ -510,25 +1265,8 @@ def perform_transaction():
             flash('Error: The account number you entered is not a valid user.')
             return redirect(url_for('send_money'))
 
-        tx_id = str(uuid.uuid4())
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        integrity_hash = None
-        if mode == 'standard':
-            # Seal Amount Only
-            raw_string = format_transaction_string(tx_id, current_user.id, receiver_id, amount, timestamp)
-            integrity_hash = hashlib.sha256(raw_string.encode()).hexdigest()
-
-        transaction = {
-            "id": tx_id,
-            "sender_id": current_user.id,
-            "receiver_id": receiver_id,
-            "amount": amount,
-            "mode": mode,
-            "timestamp": timestamp,
-            "status": "PENDING",
-            "integrity_hash": integrity_hash
-        }
+        transaction = build_pending_transaction(current_user.id, receiver_id, amount, mode)
+        integrity_hash = transaction['integrity_hash']
 
         snapshot = load_json('snapshots.json')
         snapshot.append(transaction)
@@ -538,6 +1276,91 @@ def perform_transaction():
         return redirect(url_for('dashboard'))
     except ValueError: flash('Invalid amount entered.'); return redirect(url_for('send_money'))
 
+def build_pending_transaction(sender_id, receiver_id, amount, mode):
+    tx_id = str(uuid.uuid4())
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    integrity_hash = None
+    if mode == 'standard':
+        # Seal Amount Only
+        raw_string = format_transaction_string(tx_id, sender_id, receiver_id, amount, timestamp)
+        integrity_hash = hashlib.sha256(raw_string.encode()).hexdigest()
+
+    return {
+        "id": tx_id,
+        "sender_id": sender_id,
+        "receiver_id": receiver_id,
+        "amount": amount,
+        "mode": mode,
+        "timestamp": timestamp,
+        "status": "PENDING",
+        "integrity_hash": integrity_hash
+    }
+
+BULK_MAX_ITEMS = 5000
+
+@app.route('/api/bulk_transfer', methods=['POST'])
+@login_required
+def api_bulk_transfer():
+    """
+    Queues a batch of transfers from the current user with one write to snapshots.json.
+    Body: {"transfers": [{"receiver_account": "...", "amount": 10.0, "mode": "fast"}, ...]}
+    Balance and daily limit are checked against the running total of the accepted items.
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get('transfers') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        return json.dumps({'success': False, 'message': 'Provide a non-empty "transfers" list'}), 400
+    if len(items) > BULK_MAX_ITEMS:
+        return json.dumps({'success': False, 'message': f'At most {BULK_MAX_ITEMS} transfers per batch'}), 400
+
+    # One pass over the accounts builds the index every item is checked against
+    user_data = load_json('user.json')
+    account_ids = {str(acc.get('account_id', '')).strip() for acc in user_data['accounts'].values()}
+    sender_id = str(current_user.id).strip()
+    sender = next((acc for acc in user_data['accounts'].values() if str(acc.get('account_id', '')).strip() == sender_id), None)
+    if sender is None: return json.dumps({'success': False, 'message': 'User not found'}), 404
+    balance = float(sender.get('balance', 0))
+    daily_limit = float(sender.get('daily_limit', 5000))
+
+    running_total = 0.0
+    queued = []
+    results = []
+    for i, item in enumerate(items):
+        try:
+            receiver_id = str(item['receiver_account']).strip()
+            amount = float(item['amount'])
+            mode = item.get('mode', 'fast')
+        except (KeyError, TypeError, ValueError):
+            results.append({'index': i, 'error': 'Invalid item'}); continue
+
+        if not amount > 0: error = 'Amount must be positive'
+        elif mode not in ('fast', 'standard'): error = 'Invalid mode'
+        elif receiver_id == sender_id: error = 'Cannot send to self'
+        elif receiver_id not in account_ids: error = 'Receiver is not a valid user'
+        elif running_total + amount > balance: error = 'Insufficient funds'
+        elif running_total + amount > daily_limit: error = f'Exceeds daily limit of ${daily_limit}'
+        else: error = None
+
+        if error:
+            results.append({'index': i, 'error': error}); continue
+        running_total += amount
+        transaction = build_pending_transaction(current_user.id, receiver_id, amount, mode)
+        queued.append(transaction)
+        results.append({'index': i, 'id': transaction['id']})
+
+    if queued:
+        # Not save_json: a failed write must not be reported as queued transfers
+        try:
+            snapshot = load_json_strict('snapshots.json')
+            snapshot.extend(queued)
+            write_json_atomic(get_json_path('snapshots.json'), snapshot)
+        except (OSError, ValueError) as e:
+            print(f"Error saving snapshots.json: {e}")
+            return json.dumps({'success': False, 'message': 'Could not queue the transfers; none were queued'}), 500
+
+    return json.dumps({'success': True, 'accepted': len(queued), 'rejected': len(items) - len(queued), 'total_amount': running_total, 'results': results})
+
 
 @app.route('/send_money')
 @login_required
@@ -559,9 +1382,9 @@ def check_updates():
         accounts_map[acc_id] = acc
         if acc_id == str(current_user.id).strip(): current_balance = acc['balance']
 
-    ledger = load_json('transaction.json')
+    # Newest-first scan: normally stops inside the hot segment
     latest_tx = None
-    for tx in reversed(ledger):
+    for _, tx in iter_ledger_reversed(account_id=current_user.id):
         s_id = str(tx['sender']).strip()
         r_id = str(tx['receiver']).strip()
         u_id = str(current_user.id).strip()
@@ -599,19 +1422,68 @@ def check_updates():
         }
     return json.dumps(response)
 
+@app.route('/api/balance_at')
+@login_required
+def api_balance_at():
+    """Point-in-time balance. Query by ?date=YYYY-MM-DD[ HH:MM:SS] or ?index=<ledger records applied>."""
+    account_id = request.args.get('account_id', current_user.id).strip()
+    if current_user.role != 'admin' and account_id != str(current_user.id).strip():
+        return json.dumps({'success': False, 'message': 'Not allowed'}), 403
+    try:
+        index = int(request.args['index']) if 'index' in request.args else None
+        when = parse_query_time(request.args['date']) if 'date' in request.args else None
+    except ValueError:
+        return json.dumps({'success': False, 'message': 'Invalid date or index'}), 400
+    if index is None and when is None:
+        return json.dumps({'success': False, 'message': 'Provide a date or index'}), 400
+    if index is not None and not 0 <= index <= ledger_length():
+        return json.dumps({'success': False, 'message': f'Index must be between 0 and {ledger_length()}'}), 400
+
+    balance = balance_at(account_id, index=index, when=when)
+    if balance is None: return json.dumps({'success': False, 'message': 'Account not found'}), 404
+    return json.dumps({'success': True, 'account_id': account_id, 'balance': balance})
+
 @app.route('/history')
 @login_required
 def history():
     # Ensure history is up to date
     process_fast_transactions()
 
-    ledger = load_json('transaction.json')
-    user_txs = []
-    for tx in reversed(ledger):
-        if str(tx['sender']).strip() == str(current_user.id).strip() or str(tx['receiver']).strip() == str(current_user.id).strip():
-            user_txs.append(tx)
-    transactions_json = json.dumps(user_txs)
-    return render_template('history.html', user=current_user, transactions=user_txs, transactions_json=transactions_json)
+    # Transactions are loaded page by page from /api/history
+    return render_template('history.html', user=current_user)
+
+def involves_user(tx, user_id):
+    user_id = str(user_id).strip()
+    return str(tx['sender']).strip() == user_id or str(tx['receiver']).strip() == user_id
+
+@app.route('/api/history')
+@login_required
+def api_history():
+    """Paged user history. Params: cursor, limit, filter (all/received/transfers), order (newest/oldest)."""
+    user_id = str(current_user.id).strip()
+    tx_filter = request.args.get('filter', 'all')
+    def match(tx):
+        if not involves_user(tx, user_id): return False
+        is_sender = str(tx['sender']).strip() == user_id
+        if tx_filter == 'received': return not is_sender
+        if tx_filter == 'transfers': return is_sender
+        return True
+    try:
+        items, next_cursor = ledger_page(match, request.args.get('cursor'), page_limit(request.args.get('limit')), request.args.get('order', 'newest'), user_id)
+    except ValueError:
+        return json.dumps({'success': False, 'message': 'Invalid cursor'}), 400
+
+    page = []
+    for _, tx in items:
+        is_sender = str(tx['sender']).strip() == user_id
+        page.append({
+            'id': tx['id'],
+            'type': 'transfers' if is_sender else 'received',
+            'counterparty': str(tx['receiver'] if is_sender else tx['sender']),
+            'timestamp': tx['timestamp'],
+            'amount': tx['final_amount']
+        })
+    return json.dumps({'success': True, 'transactions': page, 'next_cursor': next_cursor})
 
 # --- LIMIT PAGE LOGIC (RESTORED & EXPANDED) ---
 @app.route('/limit', methods=['GET', 'POST'])
@@ -662,7 +1534,8 @@ def generate_transcript():
         flash("Invalid Date Format")
         return redirect(url_for('download_transcript'))
 
-    ledger = load_json('transaction.json')
+    # Only segments whose timestamp range touches the requested period are opened
+    ledger = load_ledger_range(start_date, end_date)
     filtered_txs = []
 
     for tx in ledger:
@@ -758,38 +1631,123 @@ def personal_details(): return render_template('personal_details.html', user=cur
 @app.route('/verify_integrity')
 @login_required
 def verify_integrity():
-    ledger = load_json('transaction.json')
-    user_txs = []
-    global_merkle_root = get_merkle_root()
-    for tx in ledger:
-        if str(tx['sender']).strip() == str(current_user.id).strip() or str(tx['receiver']).strip() == str(current_user.id).strip():
+    # Transactions are loaded page by page from /api/verify_integrity
+    return render_template('verify_integrity.html', user=current_user)
 
-            # Integrity check for display
-            actual_data_hash = hashlib.sha256(str(float(tx['final_amount'])).encode()).hexdigest()
-
-            if tx['mode'] == 'standard': received_hash = tx.get('integrity_hash')
-            else: received_hash = hashlib.sha256(str(float(tx['original_amount'])).encode()).hexdigest()
-
-            processed_tx = {
-                'id': tx['id'],
-                'data': f"Sender: {tx['sender']} | Amt: {tx['final_amount']} | Time: {tx['timestamp']}",
-                'receivedHash': received_hash,
-                'actualDataHash': actual_data_hash,
-                'sender': tx['sender'],
-                'receiver': tx['receiver'],
-                'final_amount': tx['final_amount'],
-                'mode': tx['mode'],
-                'timestamp': tx['timestamp']
-            }
-            user_txs.append(processed_tx)
-    user_txs.reverse()
-    transactions_json = json.dumps(user_txs)
-    return render_template('verify_integrity.html', user=current_user, transactions=user_txs, transactions_json=transactions_json, merkle_root=global_merkle_root)
+@app.route('/api/verify_integrity')
+@login_required
+def api_verify_integrity():
+    try:
+        items, next_cursor = ledger_page(lambda tx: involves_user(tx, current_user.id), request.args.get('cursor'), page_limit(request.args.get('limit')), account_id=current_user.id)
+    except ValueError:
+        return json.dumps({'success': False, 'message': 'Invalid cursor'}), 400
+
+    page = []
+    for _, tx in items:
+        # Integrity check for display
+        actual_data_hash = hashlib.sha256(str(float(tx['final_amount'])).encode()).hexdigest()
+
+        if tx['mode'] == 'standard': received_hash = tx.get('integrity_hash')
+        else: received_hash = hashlib.sha256(str(float(tx['original_amount'])).encode()).hexdigest()
+
+        page.append({
+            'id': tx['id'],
+            'data': f"Sender: {tx['sender']} | Amt: {tx['final_amount']} | Time: {tx['timestamp']}",
+            'receivedHash': received_hash,
+            'actualDataHash': actual_data_hash,
+            'sender': tx['sender'],
+            'receiver': tx['receiver'],
+            'final_amount': tx['final_amount'],
+            'mode': tx['mode'],
+            'timestamp': tx['timestamp']
+        })
+    return json.dumps({'success': True, 'transactions': page, 'next_cursor': next_cursor})
 
 @app.route('/recieve_message')
 @login_required
 def recieve_message(): return render_template('recieve_message.html', user=current_user)
 
+# --- MERKLE CONSISTENCY ROUTES ---
+# Public: roots and proofs are hashes only, and auditors need not hold an account.
+@app.route('/api/merkle/roots')
+def api_merkle_roots():
+    """Published root log, oldest first. ?after=<tree_size> continues from a known root."""
+    try: after = max(0, int(request.args.get('after', 0)))
+    except ValueError: return json.dumps({'success': False, 'message': 'Invalid after'}), 400
+    tree = get_consistency_tree()
+    roots = load_root_log(after, page_limit(request.args.get('limit')))
+    return json.dumps({'success': True, 'current': {'tree_size': tree.size(), 'root_hash': tree.rootHash()}, 'roots': roots})
+
+@app.route('/api/merkle/consistency')
+def api_merkle_consistency():
+    """?first=m&second=n (default: current size). Proof that the first m records are a prefix of the first n."""
+    tree = get_consistency_tree()
+    try:
+        first = int(request.args['first'])
+        second = int(request.args.get('second', tree.size()))
+        proof = tree.consistencyProof(first, second)
+    except (KeyError, ValueError):
+        return json.dumps({'success': False, 'message': f'Need 0 < first <= second <= {tree.size()}'}), 400
+    return json.dumps({
+        'success': True, 'first': first, 'second': second,
+        'first_root': tree.rootHash(first), 'second_root': tree.rootHash(second), 'proof': proof
+    })
+
+# --- REPLICA MODE ---
+# Endpoints a replica serves; everything else belongs to the primary (the write path).
+REPLICA_ENDPOINTS = {
+    'static', 'login_page', 'logout', 'dashboard', 'check_updates', 'history', 'api_history',
+    'verify_integrity', 'api_verify_integrity', 'download_transcript', 'generate_transcript',
+    'admin_dashboard', 'api_admin_ledger', 'api_replica_status'
+}
+
+@app.before_request
+def replica_guard():
+    if not replica: return None
+    # login_view points here, so unauthenticated reads land on the primary's login form;
+    # 307 keeps a POSTed form intact
+    if request.endpoint == 'login' and PRIMARY_URL:
+        return redirect(PRIMARY_URL + request.full_path.rstrip('?'), code=307)
+    allowed = request.endpoint in REPLICA_ENDPOINTS
+    # Only the ledger view of the admin dashboard is read-only
+    if request.endpoint == 'admin_dashboard' and request.args.get('view') != 'ledger': allowed = False
+    if not allowed:
+        return json.dumps({'success': False, 'message': 'Read-only replica: send this request to the primary'}), 503
+
+@app.route('/api/replica/status')
+def api_replica_status():
+    if replica: return json.dumps(replica.status())
+    size = log_size(get_json_path(REPLICATION_LOG))
+    return json.dumps({"mode": "primary", "replication": REPLICATION, "log_size": size, "ledger_length": ledger_length()})
+
+def read_primary_files():
+    """(user_data, ledger) straight from the data files, never from the replica's own state."""
+    with open(get_json_path('user.json'), 'r') as f: user_data = json.load(f)
+    ledger = []
+    for segment in load_manifest()['segments']: ledger.extend(read_segment(segment))
+    return user_data, ledger
+
+def start_replica():
+    """Switches this process to follower mode: bootstrap from the data files, then tail the log."""
+    global replica
+    log_path = get_json_path(REPLICATION_LOG)
+    if not os.path.exists(log_path):
+        print("No replication log yet: is the primary running with BANK_REPLICATION=1?")
+    if not PRIMARY_URL:
+        print("BANK_PRIMARY_URL is not set: the load balancer must route /login to the primary")
+    follower = LedgerReplica(log_path, read_primary_files)
+    follower.poll()
+    replica = follower.start()
+
+if os.environ.get('BANK_REPLICA') == '1': start_replica() # e.g. BANK_REPLICA=1 gunicorn main:app
+
 if __name__ == '__main__':
-    init_files()
-    app.run(debug=True)
\ No newline at end of file
+    if '--replica' in sys.argv:
+        if not replica: start_replica()
+        port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else 5001
+        app.run(port=port, use_reloader=False)
+    else:
+        init_files()
+        # The debug reloader re-runs this file in a child process; only the parent owns the marker
+        if os.environ.get('WERKZEUG_RUN_MAIN') != 'true': startup_recovery(force='--recover' in sys.argv)
+        app.run(debug=True)
\ No newline at end of file
@@ -111,4 +111,83 @@ class merkleTree: # Defing Markle Tree
         if hash1 == hash2 :
             return True
         else:
-            return False
\ No newline at end of file
+            return False
+
+# --- APPEND-ONLY TREE (RFC 6962 / Certificate Transparency) ---
+# merkleTree above is heap-shaped, so its root for n leaves does not contain the root for
+# m < n leaves and nothing can be proven between them. This tree splits every range at
+# the largest power of two below its size, so older trees are always left subtrees of
+# newer ones and a consistency proof needs only O(log n) hashes.
+#
+#   levels[0] = [L0, L1, L2, L3, L4]       leaf hashes
+#   levels[1] = [H(L0,L1), H(L2,L3)]       complete subtrees of 2 leaves
+#   levels[2] = [H(H01,H23)]               complete subtrees of 4 leaves
+
+def leafHash(data): # 0x00 / 0x01 prefixes keep leaves and nodes from being confused
+    return hashlib.sha256(b'\x00' + data.encode()).hexdigest()
+
+def nodeHash(left, right):
+    return hashlib.sha256(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+def largestPowerOfTwoBelow(n): # largest k = 2^i with k < n, for n >= 2
+    return 1 << ((n - 1).bit_length() - 1)
+
+class appendOnlyTree:
+    def __init__(self):
+        self.levels = [[]]
+
+    def size(self):
+        return len(self.levels[0])
+
+    def append(self, data): # O(log n): completes every subtree the new leaf closes
+        self.levels[0].append(leafHash(data))
+        level, index = 0, self.size() - 1
+        while index % 2 == 1:
+            parent = nodeHash(self.levels[level][index - 1], self.levels[level][index])
+            level, index = level + 1, index // 2
+            if len(self.levels) == level: self.levels.append([])
+            self.levels[level].append(parent)
+
+    def __subtreeHash(self, start, end): # MTH(D[start:end])
+        n = end - start
+        if n & (n - 1) == 0 and start % n == 0: # complete subtree, already stored
+            return self.levels[n.bit_length() - 1][start // n]
+        k = largestPowerOfTwoBelow(n)
+        return nodeHash(self.__subtreeHash(start, start + k), self.__subtreeHash(start + k, end))
+
+    def rootHash(self, n=None): # root of the tree made of the first n leaves
+        n = self.size() if n is None else n
+        if n == 0: return hashlib.sha256(b'').hexdigest()
+        return self.__subtreeHash(0, n)
+
+    def consistencyProof(self, m, n=None): # proof that the first m leaves are a prefix of the first n
+        n = self.size() if n is None else n
+        if not 0 < m <= n <= self.size(): raise ValueError("need 0 < m <= n <= size")
+
+        def __subProof(m, start, end, complete):
+            if m == end - start:
+                return [] if complete else [self.__subtreeHash(start, end)]
+            k = largestPowerOfTwoBelow(end - start)
+            if m <= k:
+                return __subProof(m, start, start + k, complete) + [self.__subtreeHash(start + k, end)]
+            return __subProof(m - k, start + k, end, False) + [self.__subtreeHash(start, start + k)]
+
+        return __subProof(m, 0, n, True)
+
+def verifyConsistency(m, n, oldRoot, newRoot, proof): # RFC 9162 2.1.4.2, needs only the two roots
+    if m == n: return oldRoot == newRoot and not proof
+    if not 0 < m < n or not proof: return False
+    proof = list(proof)
+    if m & (m - 1) == 0: proof.insert(0, oldRoot) # old tree is itself a subtree of the new one
+    fn, sn = m - 1, n - 1
+    while fn & 1: fn, sn = fn >> 1, sn >> 1
+    fr = sr = proof[0]
+    for c in proof[1:]:
+        if sn == 0: return False
+        if fn & 1 or fn == sn:
+            fr, sr = nodeHash(c, fr), nodeHash(c, sr)
+            while not fn & 1 and fn != 0: fn, sn = fn >> 1, sn >> 1
+        else:
+            sr = nodeHash(sr, c)
+        fn, sn = fn >> 1, sn >> 1
+    return fr == oldRoot and sr == newRoot and sn == 0
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+
+# Read-replica support.
+#
+# A primary started with replication enabled appends every ledger append and every
+# account change to a local replication log (one JSON object per line). A follower
+# bootstraps from the data files, then tails the log from the byte offset it started at
+# and keeps its own in-memory copy of accounts and ledger, plus a per-account index of
+# ledger positions.
+#
+#   {"type": "ledger", "first_index": 76, "records": [...], "written_at": 1767225600.0}
+#   {"type": "accounts", "accounts": {"user1": {...}}, "removed": [], "written_at": ...}
+#
+# Once the log passes max_bytes it is rotated to <log>.1 and a new one is started.
+# A follower finishes the rotated file before moving on; one that fell more than a
+# whole log behind bootstraps again from the data files.
+
+def append_log_entry(log_path, entry, max_bytes=None):
+    if max_bytes and log_size(log_path) > max_bytes: os.replace(log_path, log_path + '.1')
+    entry = dict(entry, written_at=time.time())
+    with open(log_path, 'a') as f: f.write(json.dumps(entry) + '\n')
+
+def log_size(log_path):
+    return os.path.getsize(log_path) if os.path.exists(log_path) else 0
+
+def log_identity(f):
+    """First line of an open log file. Every entry carries written_at, so it tells one log
+    file from the next even when the filesystem hands a rotated file's inode to a new one."""
+    f.seek(0)
+    line = f.readline()
+    return line if line.endswith('\n') else None
+
+class LedgerReplica:
+    def __init__(self, log_path, bootstrap):
+        """bootstrap() returns (user_data, ledger) read from the data files. The log position
+        is taken BEFORE calling it, so nothing is missed; entries already reflected in the
+        snapshot are applied again harmlessly."""
+        self.log_path = log_path
+        self.bootstrap = bootstrap
+        self.last_applied_at = None
+        self.lock = threading.Lock()
+        self.resync()
+
+    def resync(self):
+        try:
+            with open(self.log_path, 'rb') as f: content = f.read()
+        except FileNotFoundError: content = b''
+        offset = content.rfind(b'\n') + 1 # a half-written last entry is picked up by poll
+        log_id = content[:content.find(b'\n') + 1].decode() or None
+        user_data, ledger = self.bootstrap()
+        with self.lock:
+            self.offset, self.log_id = offset, log_id
+            self.accounts = dict(user_data.get('accounts', {}))
+            self.ledger = []
+            self.by_account = {} # account_id -> ascending list of ledger indices
+            self._append_records(0, ledger)
+
+    def _index_record(self, index, tx):
+        for acc_id in {str(tx['sender']).strip(), str(tx['receiver']).strip()}:
+            self.by_account.setdefault(acc_id, []).append(index)
+
+    def _append_records(self, first_index, records):
+        for offset, tx in enumerate(records):
+            index = first_index + offset
+            if index < len(self.ledger): continue # already have it from the snapshot
+            self.ledger.append(tx)
+            self._index_record(index, tx)
+
+    def apply(self, entry):
+        with self.lock:
+            if entry['type'] == 'ledger':
+                self._append_records(entry['first_index'], entry['records'])
+            elif entry['type'] == 'accounts':
+                self.accounts.update(entry['accounts'])
+                for key in entry.get('removed', []): self.accounts.pop(key, None)
+            self.last_applied_at = entry.get('written_at')
+
+    def _apply_lines(self, f):
+        applied = 0
+        f.seek(self.offset)
+        for line in f:
+            if not line.endswith('\n'): break # primary is mid-write, pick it up next time
+            self.offset += len(line.encode())
+            if line.strip():
+                self.apply(json.loads(line))
+                applied += 1
+        return applied
+
+    def poll(self):
+        """Applies every complete line written since the last poll. Returns how many."""
+        try: f = open(self.log_path, 'r')
+        except FileNotFoundError: return 0
+        with f:
+            log_id = log_identity(f)
+            if log_id is None: return 0 # empty, or the first entry is still being written
+            if self.log_id is None and not os.path.exists(self.log_path + '.1'):
+                self.log_id, self.offset = log_id, 0 # first log since we bootstrapped
+            if log_id == self.log_id: return self._apply_lines(f)
+        # The primary rotated the log: finish the file we were reading, then start the new one
+        try:
+            with open(self.log_path + '.1', 'r') as old:
+                if self.log_id is None or log_identity(old) != self.log_id: raise FileNotFoundError
+                applied = self._apply_lines(old)
+        except FileNotFoundError:
+            print("Replica lost its place in the replication log, bootstrapping again")
+            self.resync()
+            return 0
+        self.log_id, self.offset = log_id, 0
+        return applied + self.poll()
+
+    def start(self, interval=0.5):
+        def tail():
+            while True:
+                try: self.poll()
+                except Exception as e: print(f"Replica tail error: {e}")
+                time.sleep(interval)
+        threading.Thread(target=tail, daemon=True).start()
+        return self
+
+    def status(self):
+        size = log_size(self.log_path)
+        lag_seconds = 0.0
+        if size > self.offset:
+            # Age of the oldest entry we have not applied yet
+            with open(self.log_path, 'r') as f:
+                f.seek(self.offset)
+                line = f.readline()
+            try: lag_seconds = max(0.0, time.time() - json.loads(line)['written_at'])
+            except (ValueError, KeyError): pass
+        return {
+            "mode": "replica",
+            "applied_offset": self.offset,
+            "log_size": size,
+            "lag_bytes": max(0, size - self.offset), # 0 for a moment after a rotation
+            "lag_seconds": round(lag_seconds, 3),
+            "ledger_length": len(self.ledger),
+            "accounts": len(self.accounts),
+            "last_applied_at": self.last_applied_at
+        }
+
+    # --- READ API (mirrors the primary's file helpers) ---
+    def user_data(self):
+        with self.lock: return {"accounts": dict(self.accounts)}
+
+    def ledger_length(self):
+        return len(self.ledger)
+
+    def iter_reversed(self, before=None, account_id=None):
+        with self.lock:
+            end = len(self.ledger) if before is None else min(before, len(self.ledger))
+            if account_id is None: indices = range(end - 1, -1, -1)
+            else: indices = [i for i in reversed(self.by_account.get(str(account_id).strip(), [])) if i < end]
+        for index in indices: yield index, self.ledger[index]
+
+    def iter_forward(self, after=None, account_id=None):
+        start = 0 if after is None else after + 1
+        with self.lock:
+            if account_id is None: indices = range(start, len(self.ledger))
+            else: indices = [i for i in self.by_account.get(str(account_id).strip(), []) if i >= start]
+        for index in indices: yield index, self.ledger[index]
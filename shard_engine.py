@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+from operator import itemgetter
+from multiprocessing import Pipe, Process
+
+# Account-sharded settlement engine.
+#
+# Accounts are partitioned by a stable hash of account_id across N worker processes.
+# Each worker owns its shard's balances and settles transfers whose sender and receiver
+# both live on it. Cross-shard transfers use two-phase commit driven by the coordinator
+# (the ShardedEngine in the parent process):
+#
+#   Phase 1  sender shard RESERVES the amount (held, no longer spendable)
+#            receiver shard PREPARES the credit (votes yes if it owns the account)
+#            every shard writes what it applied to its state file before answering
+#   Decide   the coordinator writes the round's commit set to coordinator.json
+#   Phase 2  committed -> sender drops the hold, receiver applies the credit
+#            otherwise -> sender releases the hold back to the balance
+#
+# submit() splits a batch between the shards with C-level passes (a shard-map lookup per
+# transfer and a stable sort by shard), so each shard only unpickles and checks its own
+# transfers. Shards answer with compact (seq, tx_id, ok) outcomes. The coordinator only
+# intersects the votes and hash-chains the settled records in submission order, which
+# is the one step that has to be serial.
+#
+# With a data_dir, a round is atomic across shards. After a crash, ShardedEngine resumes
+# from the state files: a round whose decision was written is finished, any other round
+# is rolled back on every shard (presumed abort). Transfers queued by submit() but not
+# yet settled are not durable.
+
+COORDINATOR_FILE = 'coordinator.json'
+
+def shard_of(account_id, num_shards):
+    """Stable across processes and runs (unlike the built-in hash())."""
+    digest = hashlib.sha256(str(account_id).strip().encode()).hexdigest()
+    return int(digest[:8], 16) % num_shards
+
+def chain_hash(amount, prev_hash):
+    # Same format as main.format_transaction_string(...) + previous hash
+    return hashlib.sha256((str(float(amount)) + prev_hash).encode()).hexdigest()
+
+def make_record(tx_id, sender, receiver, amount, timestamp, shard_label):
+    return {
+        "id": tx_id,
+        "sender": sender,
+        "receiver": receiver,
+        "original_amount": amount,
+        "final_amount": amount,
+        "theft_amount": 0,
+        "mode": "fast",
+        "timestamp": timestamp,
+        "status": f"APPROVED ({shard_label})",
+        "approver": "SYSTEM",
+        "integrity_hash": "N/A"
+    }
+
+def write_durable(path, data):
+    # Written aside, flushed to disk and swapped in, so a crash leaves the old or the new file
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+# --- SHARD WORKER ---
+def _shard_worker(shard_id, balances, shard_map, num_shards, conn, data_path):
+    state = {"balances": balances, "round": 0, "entries": [], "resolved": True}
+    if data_path and os.path.exists(data_path):
+        with open(data_path, 'r') as f: state = json.load(f)
+    balances = state['balances']
+    outgoing = [] # (seq, tx_id, sender, receiver, amount, is_local) sent from this shard
+    incoming = [] # (seq, tx_id, sender, receiver, amount) cross-shard credits to vote on
+
+    def persist():
+        if data_path: write_durable(data_path, state)
+
+    def owner(account_id):
+        shard = shard_map.get(account_id)
+        return shard_of(account_id, num_shards) if shard is None else shard
+
+    def resolve(commit):
+        """Finishes the prepared round. commit=None rolls the whole round back."""
+        for seq, tx_id, sender, receiver, amount, kind in reversed(state['entries']):
+            if kind == 'local' and commit is None:
+                balances[receiver] -= amount
+                balances[sender] += amount
+            elif kind == 'debit' and (commit is None or seq not in commit): balances[sender] += amount
+            elif kind == 'credit' and commit is not None and seq in commit: balances[receiver] += amount
+        if commit is None: state['entries'] = []
+        state['resolved'] = True
+        persist()
+
+    persist()
+    while True:
+        op, payload = conn.recv()
+
+        if op == 'enqueue':
+            # (seq, transfer) pairs this shard sends, and cross-shard ones it receives
+            sent, received = payload
+            for seq, tx in sent:
+                sender, receiver = str(tx['sender']).strip(), str(tx['receiver']).strip()
+                outgoing.append((seq, tx['id'], sender, receiver, float(tx['amount']), owner(receiver) == shard_id))
+            for seq, tx in received:
+                incoming.append((seq, tx['id'], str(tx['sender']).strip(), str(tx['receiver']).strip(), float(tx['amount'])))
+
+        elif op == 'phase1':
+            entries, settled, debits, credits = [], [], [], []
+            # Local transfers and cross-shard reservations compete for the same balances,
+            # so they are handled together in submission order
+            for seq, tx_id, sender, receiver, amount, is_local in outgoing:
+                ok = balances.get(sender, 0.0) >= amount and (receiver in balances or not is_local)
+                (settled if is_local else debits).append((seq, tx_id, ok))
+                if not ok: continue
+                balances[sender] -= amount
+                if is_local: balances[receiver] += amount
+                entries.append((seq, tx_id, sender, receiver, amount, 'local' if is_local else 'debit'))
+            for seq, tx_id, sender, receiver, amount in incoming:
+                ok = receiver in balances
+                credits.append((seq, tx_id, ok))
+                if ok: entries.append((seq, tx_id, sender, receiver, amount, 'credit'))
+            outgoing.clear()
+            incoming.clear()
+            state.update(round=payload, entries=entries, resolved=False)
+            persist() # prepared: must be on disk before the votes count
+            conn.send({"settled": settled, "debits": debits, "credits": credits})
+
+        elif op == 'phase2':
+            resolve(payload)
+            conn.send(True)
+
+        elif op == 'recover':
+            # payload: (round, commit) of the last decision written by the coordinator
+            decided_round, commit = payload
+            if not state['resolved']: resolve(commit if state['round'] == decided_round else None)
+            committed = []
+            if state['round'] == decided_round:
+                committed = [entry[:5] for entry in state['entries'] if entry[5] == 'local' or (entry[5] == 'debit' and entry[0] in commit)]
+            conn.send((state['round'], committed))
+
+        elif op == 'balances':
+            conn.send(dict(balances))
+
+        elif op == 'cpu_time':
+            conn.send(time.process_time())
+
+        elif op == 'stop':
+            conn.send(True)
+            return
+
+# --- COORDINATOR ---
+class ShardedEngine:
+    def __init__(self, accounts, num_shards, data_dir=None, prev_hash="0"):
+        """accounts: {account_id: balance}. data_dir: where the shards and the coordinator keep
+        their state; if it already holds an engine's state, start() resumes from it.
+        prev_hash: chain hash of the ledger tail the settled records are appended to."""
+        self.num_shards = num_shards
+        self.data_dir = data_dir
+        self.queued = [] # transfers submitted since the last settle(), in seq order
+        self.queued_base = 0 # seq of queued[0]
+        self.ledger = []
+        self.recovered = [] # records of the round finished during resume (see start)
+        self.last_hash = prev_hash
+        self.next_seq = 0
+        self.round = 0
+        self.stats = {"settled": 0, "rejected": 0, "cross_shard": 0, "aborted": 0}
+        self._accounts = {str(acc_id).strip(): float(balance) for acc_id, balance in accounts.items()}
+        self._shard_map = {acc_id: shard_of(acc_id, num_shards) for acc_id in self._accounts}
+        self._workers = []
+        self._conns = []
+
+    def _decision_path(self):
+        return os.path.join(self.data_dir, COORDINATOR_FILE)
+
+    def start(self):
+        decision = None
+        if self.data_dir:
+            os.makedirs(self.data_dir, exist_ok=True)
+            if os.path.exists(self._decision_path()):
+                with open(self._decision_path(), 'r') as f: decision = json.load(f)
+                if decision['num_shards'] != self.num_shards:
+                    raise ValueError(f"{self.data_dir} holds a {decision['num_shards']}-shard engine, not {self.num_shards}")
+
+        partitions = [{} for _ in range(self.num_shards)]
+        for acc_id, balance in self._accounts.items():
+            partitions[self._shard_map[acc_id]][acc_id] = balance
+        for shard_id, balances in enumerate(partitions):
+            parent_conn, child_conn = Pipe()
+            data_path = os.path.join(self.data_dir, f"shard_{shard_id}.json") if self.data_dir else None
+            args = (shard_id, balances, self._shard_map, self.num_shards, child_conn, data_path)
+            worker = Process(target=_shard_worker, args=args, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+            self._conns.append(parent_conn)
+
+        if decision: self._resume(decision)
+        elif self.data_dir: self._write_decision(set(), None, self.last_hash, self.last_hash)
+        return self
+
+    def _resume(self, decision):
+        """Finishes or rolls back the round that was in flight, then carries on after it."""
+        commit = set(decision['commit'])
+        replies = self._broadcast('recover', (decision['round'], commit))
+        self.round = decision['round']
+        self.next_seq = self.queued_base = decision['next_seq']
+        self.last_hash = decision['last_hash']
+        # Rebuild the decided round's records only if no shard has moved past it, so a caller
+        # that crashed before appending them can still do so
+        if all(shard_round == self.round for shard_round, _ in replies):
+            settled = sorted((entry[0], entry[1:], shard_id) for shard_id, (_, entries) in enumerate(replies) for entry in entries)
+            self.recovered = self._chain(settled, decision['timestamp'], decision['prev_hash'])
+            if self.recovered and self.recovered[-1]['hash'] != self.last_hash: self.recovered = []
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(('stop', None))
+            conn.recv()
+        for worker in self._workers: worker.join()
+        self._workers, self._conns = [], []
+
+    def __enter__(self): return self.start()
+
+    def __exit__(self, *exc): self.close()
+
+    def _broadcast(self, op, payload):
+        # Pickled once for every shard; all shards work in parallel, then the replies are collected
+        message = pickle.dumps((op, payload), protocol=pickle.HIGHEST_PROTOCOL)
+        for conn in self._conns: conn.send_bytes(message)
+        return [conn.recv() for conn in self._conns]
+
+    def _shard_for(self, account_id):
+        # Unknown accounts get a shard too, and are then rejected by its owner
+        account_id = str(account_id).strip()
+        shard = self._shard_map.get(account_id)
+        return shard_of(account_id, self.num_shards) if shard is None else shard
+
+    def _write_decision(self, commit, timestamp, prev_hash, last_hash):
+        if not self.data_dir: return
+        write_durable(self._decision_path(), {
+            "num_shards": self.num_shards, "round": self.round, "next_seq": self.next_seq,
+            "commit": sorted(commit), "timestamp": timestamp, "prev_hash": prev_hash, "last_hash": last_hash
+        })
+
+    def _chain(self, settled, timestamp, prev_hash):
+        """settled: sorted (seq, (tx_id, sender, receiver, amount), shard_id). Returns chained records."""
+        records = []
+        for _, (tx_id, sender, receiver, amount), shard_id in settled:
+            record = make_record(tx_id, sender, receiver, amount, timestamp, f"SHARD {shard_id}")
+            record['previous_hash'] = prev_hash
+            record['hash'] = prev_hash = chain_hash(amount, prev_hash)
+            records.append(record)
+        return records
+
+    def submit(self, transfers):
+        """Queues transfers ({'id', 'sender', 'receiver', 'amount'}) in their shards; returns their sequence numbers."""
+        transfers = list(transfers)
+        for tx in transfers:
+            if not float(tx['amount']) > 0: raise ValueError(f"Transfer {tx['id']}: amount must be positive")
+        base, n = self.next_seq, self.num_shards
+        senders = list(map(self._shard_map.get, map(itemgetter('sender'), transfers)))
+        receivers = list(map(self._shard_map.get, map(itemgetter('receiver'), transfers)))
+        if None in senders or None in receivers: # ids that need normalizing, or unknown accounts
+            senders = [self._shard_for(tx['sender']) if shard is None else shard for tx, shard in zip(transfers, senders)]
+            receivers = [self._shard_for(tx['receiver']) if shard is None else shard for tx, shard in zip(transfers, receivers)]
+        # Local transfers go to bucket n so only cross-shard ones reach the receiver's shard
+        credit_shards = [r if r != s else n for s, r in zip(senders, receivers)]
+        by_sender = sorted(range(len(transfers)), key=senders.__getitem__) # stable: seq order per shard
+        by_receiver = sorted(range(len(transfers)), key=credit_shards.__getitem__)
+        sent_at = received_at = 0
+        for shard_id, conn in enumerate(self._conns):
+            sent = by_sender[sent_at:sent_at + senders.count(shard_id)]
+            received = by_receiver[received_at:received_at + credit_shards.count(shard_id)]
+            sent_at, received_at = sent_at + len(sent), received_at + len(received)
+            if not sent and not received: continue
+            payload = ([(base + i, transfers[i]) for i in sent], [(base + i, transfers[i]) for i in received])
+            conn.send_bytes(pickle.dumps(('enqueue', payload), protocol=pickle.HIGHEST_PROTOCOL))
+        self.queued.extend(transfers)
+        self.next_seq += len(transfers)
+        return list(range(base, self.next_seq))
+
+    def settle(self):
+        """Settles everything queued in the shards; returns the newly chained ledger records."""
+        if not self.queued: return []
+        queued, base = self.queued, self.queued_base
+        self.queued, self.queued_base = [], self.next_seq
+        self.round += 1
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        replies = self._broadcast('phase1', self.round)
+        settled, debit_ok, credit_ok = [], {}, set()
+        for shard_id, reply in enumerate(replies):
+            for seq, tx_id, ok in reply['settled']:
+                if ok: settled.append((seq, tx_id, shard_id))
+                else: self.stats['rejected'] += 1
+            self.stats['cross_shard'] += len(reply['debits'])
+            debit_ok.update((seq, (tx_id, shard_id)) for seq, tx_id, ok in reply['debits'] if ok)
+            credit_ok.update(seq for seq, _, ok in reply['credits'] if ok)
+
+        # Commit decision for every cross-shard transfer: both sides voted yes
+        commit = credit_ok.intersection(debit_ok)
+        self.stats['aborted'] += sum(len(reply['debits']) for reply in replies) - len(commit)
+        settled.extend((seq,) + debit_ok[seq] for seq in commit)
+
+        # Deterministic merge: submission order, then hash-chain onto the ledger tail
+        settled.sort()
+        rows = []
+        for seq, tx_id, shard_id in settled:
+            tx = queued[seq - base]
+            rows.append((seq, (tx_id, str(tx['sender']).strip(), str(tx['receiver']).strip(), float(tx['amount'])), shard_id))
+        records = self._chain(rows, timestamp, self.last_hash)
+        prev_hash = self.last_hash
+        if records: self.last_hash = records[-1]['hash']
+
+        self._write_decision(commit, timestamp, prev_hash, self.last_hash) # the commit point
+        self._broadcast('phase2', commit)
+        self.ledger.extend(records)
+        self.stats['settled'] += len(records)
+        return records
+
+    def shard_cpu_times(self):
+        """CPU seconds each worker process has used so far."""
+        return self._broadcast('cpu_time', None)
+
+    def balances(self):
+        merged = {}
+        for shard_balances in self._broadcast('balances', None): merged.update(shard_balances)
+        return merged
@@ -165,6 +165,136 @@ document.addEventListener('DOMContentLoaded', function() {
         setTimeout(remove, 5000);
     }
 
+    // --- LEDGER PAGING (Only runs if on Ledger Tab) ---
+    const ledgerBody = document.getElementById('ledger-body');
+    const ledgerSentinel = document.getElementById('ledger-sentinel');
+    let ledgerCursor = null;
+    let ledgerHasMore = true;
+    let ledgerLoading = false;
+
+    function escapeHtml(value) {
+        return String(value ?? '').replace(/[&<>"']/g, ch => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[ch]));
+    }
+
+    function renderLedgerRow(tx) {
+        const edited = tx.original_amount !== tx.final_amount;
+        const finalHtml = edited
+            ? `<span style="color:#f87171; font-weight:bold;">$${escapeHtml(tx.final_amount)} (Edited)</span>`
+            : `<span style="color:#4ade80;">$${escapeHtml(tx.final_amount)}</span>`;
+        return `
+            <tr>
+                <td style="font-size:0.85em; color:#94a3b8;">${escapeHtml(tx.timestamp)}</td>
+                <td>${escapeHtml(tx.sender)}</td>
+                <td>${escapeHtml(tx.receiver)}</td>
+                <td style="color:#94a3b8;">$${escapeHtml(tx.original_amount)}</td>
+                <td>${finalHtml}</td>
+                <td><span style="color:#c4b5fd;">APPROVED</span></td>
+            </tr>
+        `;
+    }
+
+    function loadLedgerPage() {
+        if (!ledgerBody || ledgerLoading || !ledgerHasMore) return;
+        ledgerLoading = true;
+
+        const url = '/api/admin/ledger' + (ledgerCursor ? '?cursor=' + encodeURIComponent(ledgerCursor) : '');
+        fetch(url)
+            .then(res => res.json())
+            .then(data => {
+                if (!data.success) throw new Error(data.message);
+                ledgerBody.insertAdjacentHTML('beforeend', data.transactions.map(renderLedgerRow).join(''));
+                ledgerCursor = data.next_cursor;
+                ledgerHasMore = Boolean(ledgerCursor);
+
+                if (!ledgerHasMore && ledgerSentinel) ledgerSentinel.style.display = 'none';
+                if (ledgerBody.children.length === 0) {
+                    document.getElementById('ledger-empty').classList.remove('hidden');
+                    document.getElementById('ledger-table-container').classList.add('hidden');
+                }
+            })
+            .catch(err => console.error("Ledger Loading Error:", err))
+            .finally(() => { ledgerLoading = false; });
+    }
+
+    if (ledgerBody && ledgerSentinel) {
+        // The sentinel sits inside the scroll container, so observe relative to it
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) loadLedgerPage();
+        }, { root: document.getElementById('ledger-table-container') });
+        observer.observe(ledgerSentinel);
+    }
+
+    // --- ACCOUNT SEARCH (Only runs if on Accounts Tab) ---
+    const accountsBody = document.getElementById('accounts-body');
+    const accountsSentinel = document.getElementById('accounts-sentinel');
+    const accountSearch = document.getElementById('account-search');
+    let accountsCursor = accountsBody ? accountsBody.dataset.nextCursor || null : null;
+    let accountsQuery = accountSearch ? accountSearch.value : '';
+    let accountsRequest = 0; // Drops responses for queries the admin has already typed past
+    let accountsLoading = false;
+
+    function renderAccountRow(acc) {
+        const status = acc.is_locked
+            ? '<span style="color:#f87171;">LOCKED</span>'
+            : '<span style="color:#4ade80;">Active</span>';
+        const role = String(acc.role || '');
+        const action = role === 'admin' ? '' : `
+            <form action="/admin/toggle_lock/${encodeURIComponent(acc.account_id)}" method="POST">
+                ${acc.is_locked ? '<button class="btn-sm btn-unlock">Unlock</button>' : '<button class="btn-sm btn-lock">Lock</button>'}
+            </form>`;
+        return `
+            <tr>
+                <td style="color:#c4b5fd;">${escapeHtml(acc.account_id)}</td>
+                <td>${escapeHtml(acc.username)}</td>
+                <td>${escapeHtml(role.charAt(0).toUpperCase() + role.slice(1).toLowerCase())}</td>
+                <td>$${escapeHtml(acc.balance)}</td>
+                <td>${status}</td>
+                <td>${action}</td>
+            </tr>
+        `;
+    }
+
+    function loadAccounts(reset) {
+        if (!accountsBody || (!reset && (accountsLoading || !accountsCursor))) return;
+        const requestId = ++accountsRequest;
+        accountsLoading = true;
+
+        let url = '/api/admin/accounts/search?q=' + encodeURIComponent(accountsQuery);
+        if (!reset) url += '&cursor=' + encodeURIComponent(accountsCursor);
+        fetch(url)
+            .then(res => res.json())
+            .then(data => {
+                if (requestId !== accountsRequest) return;
+                if (!data.success) throw new Error(data.message);
+                const rows = data.accounts.map(renderAccountRow).join('');
+                if (reset) accountsBody.innerHTML = rows;
+                else accountsBody.insertAdjacentHTML('beforeend', rows);
+                accountsCursor = data.next_cursor;
+                accountsSentinel.classList.toggle('hidden', !accountsCursor);
+                document.getElementById('accounts-empty').classList.toggle('hidden', accountsBody.children.length > 0);
+            })
+            .catch(err => console.error("Account Search Error:", err))
+            .finally(() => { if (requestId === accountsRequest) accountsLoading = false; });
+    }
+
+    if (accountsBody && accountSearch) {
+        let debounce = null;
+        accountSearch.addEventListener('input', () => {
+            clearTimeout(debounce);
+            debounce = setTimeout(() => {
+                accountsQuery = accountSearch.value;
+                history.replaceState(null, '', '?view=accounts&q=' + encodeURIComponent(accountsQuery));
+                loadAccounts(true);
+            }, 200);
+        });
+        document.getElementById('account-search-form').addEventListener('submit', e => e.preventDefault());
+
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) loadAccounts(false);
+        }, { root: document.getElementById('accounts-table-container') });
+        observer.observe(accountsSentinel);
+    }
+
     // Start Polling immediately
     fetchAdminQueue();
     setInterval(fetchAdminQueue, 2000);
@@ -1,29 +1,109 @@
 document.addEventListener('DOMContentLoaded', function() {
-    
+
+    const transactionList = document.querySelector('.transaction-list');
+    const statusEl = document.getElementById('history-status');
+    const sentinel = document.getElementById('history-sentinel');
+
+    // --- Paging State ---
+    // Pages come from /api/history; the cursor is handed back by the server
+    let currentFilter = 'all';
+    let currentOrder = 'newest';
+    let nextCursor = null;
+    let hasMore = true;
+    let isLoading = false;
+    let historyRequest = 0; // Bumped on filter/order change so stale responses are dropped
+
+    function escapeHtml(value) {
+        return String(value ?? '').replace(/[&<>"']/g, ch => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[ch]));
+    }
+
+    function renderTransaction(tx) {
+        const isTransfer = tx.type === 'transfers';
+        const item = document.createElement('div');
+        item.className = 'transaction-item';
+        item.dataset.type = tx.type;
+        item.dataset.date = tx.timestamp;
+        item.dataset.amount = tx.amount;
+
+        item.innerHTML = `
+            <div class="transaction-details">
+                <div class="transaction-title">
+                    ${isTransfer ? 'Transfer to' : 'Received from'} ...${escapeHtml(String(tx.counterparty).slice(-4))}
+                </div>
+                <div class="transaction-date">${escapeHtml(tx.timestamp)}</div>
+            </div>
+            <div class="transaction-amount ${isTransfer ? 'debit' : 'credit'}">
+                ${isTransfer ? '-' : '+'} $${parseFloat(tx.amount).toFixed(2)}
+            </div>
+        `;
+        return item;
+    }
+
+    function loadNextPage() {
+        if (isLoading || !hasMore || !transactionList) return;
+        const requestId = historyRequest;
+        isLoading = true;
+
+        const params = new URLSearchParams({ filter: currentFilter, order: currentOrder });
+        if (nextCursor) params.set('cursor', nextCursor);
+
+        fetch('/api/history?' + params.toString())
+            .then(res => res.json())
+            .then(data => {
+                if (requestId !== historyRequest) return;
+                if (!data.success) throw new Error(data.message);
+                data.transactions.forEach(tx => transactionList.appendChild(renderTransaction(tx)));
+                nextCursor = data.next_cursor;
+                hasMore = Boolean(nextCursor);
+
+                if (statusEl) {
+                    const isEmpty = transactionList.children.length === 0;
+                    statusEl.textContent = isEmpty ? 'No transactions found.' : '';
+                    statusEl.style.display = isEmpty ? 'block' : 'none';
+                }
+            })
+            .catch(err => console.error("History Loading Error:", err))
+            .finally(() => {
+                if (requestId !== historyRequest) return;
+                isLoading = false;
+                // Keep filling until the sentinel is pushed off screen
+                if (hasMore && sentinel && sentinel.getBoundingClientRect().top < window.innerHeight) loadNextPage();
+            });
+    }
+
+    function reloadHistory() {
+        historyRequest++;
+        transactionList.innerHTML = '';
+        nextCursor = null;
+        hasMore = true;
+        isLoading = false; // The in-flight page belongs to the old filter/order
+        if (statusEl) {
+            statusEl.textContent = 'Loading transactions...';
+            statusEl.style.display = 'block';
+        }
+        loadNextPage();
+    }
+
+    if (sentinel) {
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) loadNextPage();
+        });
+        observer.observe(sentinel);
+    }
+
     // --- Filter Logic ---
     const filterButtons = document.querySelectorAll('.filter-button');
-    const transactionList = document.querySelector('.transaction-list');
-    
+    const filterValues = { 'all transactions': 'all', 'received': 'received', 'transfers': 'transfers' };
+
     if(filterButtons.length > 0 && transactionList) {
         filterButtons.forEach(button => {
             button.addEventListener('click', function() {
                 filterButtons.forEach(btn => btn.classList.remove('active'));
                 this.classList.add('active');
-                
-                const selectedFilter = this.textContent.trim().toLowerCase();
-                const items = transactionList.querySelectorAll('.transaction-item');
-
-                items.forEach(item => {
-                    const itemType = item.dataset.type || ''; 
-                    
-                    if (selectedFilter === 'all transactions') {
-                        item.style.display = 'flex';
-                    } else if (itemType.includes(selectedFilter)) {
-                        item.style.display = 'flex';
-                    } else {
-                        item.style.display = 'none';
-                    }
-                });
+
+                // Filtering happens server side so paging stays correct
+                currentFilter = filterValues[this.textContent.trim().toLowerCase()] || 'all';
+                reloadHistory();
             });
         });
     }
@@ -49,30 +129,30 @@ document.addEventListener('DOMContentLoaded', function() {
             option.addEventListener('click', function() {
                 sortOptions.forEach(opt => opt.classList.remove('active'));
                 this.classList.add('active');
-                sortDropdown.classList.remove('show'); 
+                sortDropdown.classList.remove('show');
 
                 const criteria = this.dataset.sort;
-                sortTransactions(criteria);
+                if (criteria === 'newest' || criteria === 'oldest') {
+                    // Date order is the ledger order, so the server pages it
+                    currentOrder = criteria;
+                    reloadHistory();
+                } else {
+                    sortTransactions(criteria);
+                }
             });
         });
     }
 
+    // Amount sorting applies to the transactions loaded so far
     function sortTransactions(criteria) {
         if (!transactionList) return;
         const items = Array.from(transactionList.querySelectorAll('.transaction-item'));
 
         items.sort((a, b) => {
-            const dateAStr = a.dataset.date.replace(/-/g, '/'); 
-            const dateBStr = b.dataset.date.replace(/-/g, '/');
-            const dateA = new Date(dateAStr);
-            const dateB = new Date(dateBStr);
-
             const amtA = parseFloat(a.dataset.amount);
             const amtB = parseFloat(b.dataset.amount);
 
             switch(criteria) {
-                case 'newest': return dateB - dateA;
-                case 'oldest': return dateA - dateB;
                 case 'highest': return amtB - amtA;
                 case 'lowest': return amtA - amtB;
                 default: return 0;
@@ -82,4 +162,6 @@ document.addEventListener('DOMContentLoaded', function() {
         transactionList.innerHTML = '';
         items.forEach(item => transactionList.appendChild(item));
     }
-});
\ No newline at end of file
+
+    loadNextPage();
+});
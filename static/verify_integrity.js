@@ -1,11 +1,85 @@
-// --- DATA IS LOADED FROM THE HTML TEMPLATE ---
-// The 'transactions' array is injected via the <script> block in the HTML file.
+// --- DATA IS LOADED PAGE BY PAGE FROM /api/verify_integrity ---
+// Every loaded transaction is appended to the global 'transactions' array;
+// list items point into it through their data-index attribute.
 
+let transactions = [];
 let currentTxIndex = null;
+let nextCursor = null;
+let hasMore = true;
+let isLoading = false;
+
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[ch]));
+}
+
+function renderTransaction(tx, index, userId) {
+    const isStandard = tx.mode === 'standard';
+    const item = document.createElement('div');
+    item.className = 'transaction-item';
+    item.dataset.index = index;
+    item.onclick = () => openVerification(item.dataset.index);
+
+    item.innerHTML = `
+        <div class="t-info">
+            <h4>${String(tx.sender) === userId ? `Sent to ${escapeHtml(tx.receiver)}` : `Received from ${escapeHtml(tx.sender)}`}</h4>
+            <p>ID: ${escapeHtml(tx.id)}</p>
+        </div>
+        <div class="t-right">
+            <div class="t-amount ${isStandard ? 'amount-standard' : 'amount-fast'}">
+                ${isStandard ? '🔒' : '⚡'} $${escapeHtml(tx.final_amount)}
+            </div>
+            <div class="t-status">Click to Verify</div>
+        </div>
+    `;
+    return item;
+}
+
+function loadNextPage() {
+    const list = document.querySelector('.transaction-list');
+    const statusEl = document.getElementById('ledger-status');
+    const sentinel = document.getElementById('ledger-sentinel');
+    if (isLoading || !hasMore || !list) return;
+    isLoading = true;
+
+    const url = '/api/verify_integrity' + (nextCursor ? '?cursor=' + encodeURIComponent(nextCursor) : '');
+    fetch(url)
+        .then(res => res.json())
+        .then(data => {
+            if (!data.success) throw new Error(data.message);
+            data.transactions.forEach(tx => {
+                transactions.push(tx);
+                list.appendChild(renderTransaction(tx, transactions.length - 1, list.dataset.userId));
+            });
+            nextCursor = data.next_cursor;
+            hasMore = Boolean(nextCursor);
+
+            if (statusEl) {
+                statusEl.textContent = transactions.length === 0 ? 'No transactions found in ledger.' : '';
+                statusEl.style.display = transactions.length === 0 ? 'block' : 'none';
+            }
+        })
+        .catch(err => console.error("Ledger Loading Error:", err))
+        .finally(() => {
+            isLoading = false;
+            // Keep filling until the sentinel is pushed off screen
+            if (hasMore && sentinel && sentinel.getBoundingClientRect().top < window.innerHeight) loadNextPage();
+        });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const sentinel = document.getElementById('ledger-sentinel');
+    if (sentinel) {
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) loadNextPage();
+        });
+        observer.observe(sentinel);
+    }
+    loadNextPage();
+});
 
 function openVerification(index) {
     currentTxIndex = index;
-    // Access the global variable 'transactions' defined in the HTML
+    // Access the global 'transactions' array filled by loadNextPage()
     if (typeof transactions === 'undefined' || !transactions || !transactions[index]) return;
     
     const tx = transactions[index];